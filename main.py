@@ -2,9 +2,16 @@ import multiprocessing
 import sys
 import time
 import os
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from service.screenshooter import draw_roi, take_screenshot, save_screenshot, take_screenshot_roi
-from service.pdf_handler import save_images_to_pdf
+from service.pdf_handler import save_images_to_pdf, watch_images_to_pdf
+from service.frame_store import FrameStore
+from service.recompressor import (
+    INTERMEDIATE_FORMATS, BackgroundRecompressor, needs_recompression, recompress_images
+)
+from service.worker_pool import load_jobs, run_worker_pool
+from service.stitcher import ScrollStitcher
+from service.timed_capture import TimedCapture
 from service.input_simulator import *
 
 
@@ -16,23 +23,35 @@ def parse_arguments():
     - The number of times to repeat the screenshot and key press process.
     - The directory where screenshots and the final PDF should be saved.
     - Whether to capture fullscreen screenshots or a region of interest.
+    - An optional frame store directory shared across sessions.
+    - The intermediate image format used during capture, and whether to recompress in the background.
+    - An optional page height that turns on scroll-and-stitch capture.
+    - Whether to write a linearized ("fast web view") PDF.
+    - An optional frame rate that turns on timed capture, where the repeat count is the number of frames.
 
     If the repeat count is not provided, it uses a default value from a JSON configuration file.
     If the specified save directory doesn't exist, it attempts to create it.
 
     Returns:
-        tuple: A tuple containing (repeat_count, save_directory, fullscreen_mode).
+        tuple: A tuple containing (repeat_count, save_directory, fullscreen_mode, store_directory,
+               intermediate_format, background_recompression, stitch_page_height, linearize, fps).
 
     Raises:
         SystemExit: If required arguments are missing or if there's an error creating the save directory.
     """
     if len(sys.argv) < 3:
-        print("Usage: python main.py -c <repeat_count> -d <save_directory> [-r]")
+        print("Usage: python main.py -c <repeat_count> -d <save_directory> [-r] [-s <store_directory>] [-i <format>] [-b] [-t <page_height>] [-l] [-a <fps>]")
         sys.exit(1)
 
     repeat = None
     save_directory = None
     fullscreen = True
+    store_directory = None
+    intermediate = 'png'
+    background = False
+    stitch_height = None
+    linearize = False
+    fps = None
 
     i = 1
     while i < len(sys.argv):
@@ -53,9 +72,56 @@ def parse_arguments():
         elif sys.argv[i] == '-r':
             fullscreen = False
             i += 1
+        elif sys.argv[i] == '-s':
+            if i + 1 < len(sys.argv):
+                store_directory = sys.argv[i + 1]
+                i += 2
+            else:
+                print("Error: -s option requires a value")
+                sys.exit(1)
+        elif sys.argv[i] == '-i':
+            if i + 1 < len(sys.argv):
+                intermediate = sys.argv[i + 1]
+                i += 2
+            else:
+                print("Error: -i option requires a value")
+                sys.exit(1)
+            if intermediate not in INTERMEDIATE_FORMATS:
+                print(f"Error: -i must be one of {', '.join(INTERMEDIATE_FORMATS)}")
+                sys.exit(1)
+        elif sys.argv[i] == '-b':
+            background = True
+            i += 1
+        elif sys.argv[i] == '-t':
+            if i + 1 < len(sys.argv):
+                stitch_height = int(sys.argv[i + 1])
+                i += 2
+            else:
+                print("Error: -t option requires a value")
+                sys.exit(1)
+            if stitch_height <= 0:
+                print("Error: -t must be a positive page height")
+                sys.exit(1)
+        elif sys.argv[i] == '-l':
+            linearize = True
+            i += 1
+        elif sys.argv[i] == '-a':
+            if i + 1 < len(sys.argv):
+                fps = float(sys.argv[i + 1])
+                i += 2
+            else:
+                print("Error: -a option requires a value")
+                sys.exit(1)
+            if fps <= 0:
+                print("Error: -a must be a positive frame rate")
+                sys.exit(1)
         else:
             i += 1
 
+    if fps is not None and stitch_height is not None:
+        print("Error: -a and -t cannot be combined")
+        sys.exit(1)
+
     if save_directory is None or save_directory.strip() == '':
         print("Save directory must be provided and cannot be blank.")
         sys.exit(1)
@@ -73,21 +139,114 @@ def parse_arguments():
             print(f"Error creating directory {save_directory}: {e}")
             sys.exit(1)
 
-    return repeat, save_directory, fullscreen
+    return repeat, save_directory, fullscreen, store_directory, intermediate, background, stitch_height, linearize, fps
+
+
+def parse_worker_arguments():
+    """
+    Parse command-line arguments for the parallel worker-pool mode.
+
+    Worker-pool mode is selected with '-w <jobs_file>'. The number of Xvfb displays to
+    start can be set with '-n <workers>', or existing displays can be given as a
+    comma-separated list with '-x <displays>'.
+
+    Returns:
+        Optional[tuple]: A tuple containing (jobs_file, workers, displays), or None if
+                         worker-pool mode was not requested.
+
+    Raises:
+        SystemExit: If an option is missing its value.
+    """
+    jobs_file = None
+    workers = None
+    displays = None
+
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] in ('-w', '-n', '-x'):
+            if i + 1 >= len(sys.argv):
+                print(f"Error: {sys.argv[i]} option requires a value")
+                sys.exit(1)
+            value = sys.argv[i + 1]
+            if sys.argv[i] == '-w':
+                jobs_file = value
+            elif sys.argv[i] == '-n':
+                workers = int(value)
+            else:
+                displays = [display.strip() for display in value.split(',') if display.strip()]
+            i += 2
+        else:
+            i += 1
+
+    if jobs_file is None:
+        return None
+    return jobs_file, workers, displays
+
+
+def parse_watch_arguments():
+    """
+    Parse command-line arguments for watch mode.
+
+    Watch mode is selected with 'watch <directory>' and keeps '<directory>/output.pdf', or
+    the file given with '-o <output_pdf>', current while images land in the directory.
+    '-q <seconds>' sets how long a file must stay unchanged before it is added, and
+    '-p' polls the directory instead of using inotify.
+
+    Returns:
+        Optional[tuple]: A tuple containing (directory, output_pdf, settle_seconds, polling),
+                         or None if watch mode was not requested.
+
+    Raises:
+        SystemExit: If the directory is missing or an option is missing its value.
+    """
+    if len(sys.argv) < 2 or sys.argv[1] != 'watch':
+        return None
+    if len(sys.argv) < 3 or not os.path.isdir(sys.argv[2]):
+        print("Usage: python main.py watch <directory> [-o <output_pdf>] [-q <settle_seconds>] [-p]")
+        sys.exit(1)
+
+    directory = sys.argv[2]
+    output_pdf = os.path.join(directory, "output.pdf")
+    settle = 2.0
+    polling = False
+
+    i = 3
+    while i < len(sys.argv):
+        if sys.argv[i] in ('-o', '-q'):
+            if i + 1 >= len(sys.argv):
+                print(f"Error: {sys.argv[i]} option requires a value")
+                sys.exit(1)
+            if sys.argv[i] == '-o':
+                output_pdf = sys.argv[i + 1]
+            else:
+                settle = float(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '-p':
+            polling = True
+            i += 1
+        else:
+            i += 1
+
+    return directory, output_pdf, settle, polling
 
 
 def simulate_keys_and_take_screenshots(
         repeat: int, 
         save_directory: str, 
-        roi: Optional[Tuple[int, int, int, int]] = None
-    ):
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        store: Optional[FrameStore] = None,
+        intermediate: str = 'png',
+        recompressor: Optional[BackgroundRecompressor] = None,
+        stitcher: Optional[ScrollStitcher] = None
+    ) -> List[str]:
     """
     Simulate key presses and capture screenshots for a specified number of iterations.
 
     This function performs the following steps for each iteration:
     1. Waits for a specified delay before taking a screenshot.
     2. Captures a screenshot (either fullscreen or of a specified region).
-    3. Saves the screenshot to the specified directory.
+    3. Saves the screenshot to the specified directory, or in stitch mode appends its new rows
+       to the canvas and saves every completed page.
     4. Simulates a key press based on the configuration in 'resources/single_key.json'.
     5. Waits for a specified delay after the key press.
 
@@ -95,14 +254,32 @@ def simulate_keys_and_take_screenshots(
         repeat (int): Number of times to repeat the process.
         save_directory (str): Directory to save the captured screenshots.
         roi (Optional[Tuple[int, int, int, int]]): Region of interest for screenshots. If None, captures fullscreen.
+        store (Optional[FrameStore]): Frame store to reuse identical frames from previous sessions.
+        intermediate (str): Name of the capture-time image format in INTERMEDIATE_FORMATS.
+        recompressor (Optional[BackgroundRecompressor]): Receives each saved frame for background recompression.
+        stitcher (Optional[ScrollStitcher]): Stitches scrolled frames into fixed-height pages instead of
+                                             saving every screenshot.
+
+    Returns:
+        List[str]: Paths of the saved screenshots, or of the stitched pages.
 
     Note:
-        The function reads key press and delay configurations from 'resources/single_key.json'.
+        The function reads key press, delay and input backend configurations from 'resources/single_key.json'.
     """
     
     json_data = parse_json_file('resources/single_key.json')
     json_data['delay_before'] = 1
     json_data['delay_after'] = 1
+    set_input_backend(json_data.get('input_backend', 'pyautogui'))
+    ext, save_params = INTERMEDIATE_FORMATS[intermediate]
+    saved_paths = []
+
+    def save_frame(image, name):
+        saved_path = save_screenshot(image, os.path.join(save_directory, f"{name}{ext}"), store, save_params)
+        if saved_path:
+            saved_paths.append(saved_path)
+            if recompressor:
+                recompressor.submit(saved_path)
 
     print("Waiting 5 seconds before starting...")
     for i in range(5, 0, -1):
@@ -120,17 +297,79 @@ def simulate_keys_and_take_screenshots(
         else:
             screenshot = take_screenshot_roi(roi)
 
-        if screenshot:
-            save_path = os.path.join(save_directory, f"screenshot_{i+1}.png")
-            save_screenshot(screenshot, save_path)
+        if screenshot and stitcher:
+            for page in stitcher.add_frame(screenshot):
+                save_frame(page, f"page_{len(saved_paths)+1}")
+        elif screenshot:
+            save_frame(screenshot, f"screenshot_{i+1}")
         else:
             print(f"Failed to take screenshot on iteration {i+1}")
 
         simulate_key(json_data['skey'])
         time.sleep(json_data['delay_after'])
 
+    if stitcher:
+        for page in stitcher.finish():
+            save_frame(page, f"page_{len(saved_paths)+1}")
+
+    latency = input_latency_summary()
+    if latency:
+        print(f"Input {latency['measures']} over {latency['count']} presses: mean {latency['mean']:.2f} ms, "
+              f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+
+    return saved_paths
+
+
+def capture_timed_screenshots(
+        repeat: int,
+        fps: float,
+        save_directory: str,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        store: Optional[FrameStore] = None,
+        intermediate: str = 'png',
+        recompressor: Optional[BackgroundRecompressor] = None
+    ) -> List[str]:
+    """
+    Capture screenshots at a fixed frame rate, for animated or auto-advancing presentations.
+
+    No keys are pressed. Frames are grabbed on schedule into a size-capped buffer while
+    background threads skip frames identical to the previous one and save the rest, so
+    slow encoding shows up as dropped frames rather than as a slower capture rate.
 
-def save_images_to_pdf_file(save_directory: str):
+    Args:
+        repeat (int): Number of frames to capture, i.e. the capture lasts repeat / fps seconds.
+        fps (float): Target frame rate.
+        save_directory (str): Directory to save the captured screenshots.
+        roi (Optional[Tuple[int, int, int, int]]): Region of interest for screenshots. If None, captures fullscreen.
+        store (Optional[FrameStore]): Frame store to reuse identical frames from previous sessions.
+        intermediate (str): Name of the capture-time image format in INTERMEDIATE_FORMATS.
+        recompressor (Optional[BackgroundRecompressor]): Receives each saved frame for background recompression.
+
+    Returns:
+        List[str]: Paths of the saved screenshots, in capture order.
+    """
+    ext, save_params = INTERMEDIATE_FORMATS[intermediate]
+
+    def save_frame(image, index, captured_ns):
+        saved_path = save_screenshot(image, os.path.join(save_directory, f"frame_{index+1}{ext}"), store, save_params)
+        if saved_path:
+            # Frames are saved by several threads, so the capture time keeps them in order
+            os.utime(saved_path, ns=(captured_ns, captured_ns))
+            if recompressor:
+                recompressor.submit(saved_path)
+        return saved_path
+
+    grab = take_screenshot if roi is None else lambda: take_screenshot_roi(roi)
+    print(f"Capturing {repeat} frames at {fps:g} fps...")
+    saved_paths, stats = TimedCapture(grab, save_frame, fps).run(repeat)
+    print(f"Captured {stats['captured']} frames at {stats['fps']:.2f} fps (target {fps:g}), "
+          f"jitter {stats['jitter_ms']:.2f} ms")
+    print(f"Dropped {stats['dropped']} frames under backpressure, missed {stats['missed']} ticks, "
+          f"skipped {stats['duplicates']} duplicates, saved {stats['saved']} frames")
+    return saved_paths
+
+
+def save_images_to_pdf_file(save_directory: str, store: Optional[FrameStore] = None, linearize: bool = False):
     """
     Compile all captured screenshots in the save directory into a single PDF file.
 
@@ -141,12 +380,14 @@ def save_images_to_pdf_file(save_directory: str):
 
     Args:
         save_directory (str): Directory containing the screenshot images.
+        store (Optional[FrameStore]): Frame store to reuse prepared PDF image streams from.
+        linearize (bool): Write a linearized ("fast web view") PDF.
 
     Note:
         The output PDF will be named 'output.pdf' and saved in the same directory as the screenshots.
     """
     pdf_path = os.path.join(save_directory, "output.pdf")
-    save_images_to_pdf(save_directory, pdf_path)
+    save_images_to_pdf(save_directory, pdf_path, store=store, linearize=linearize)
     print(f"PDF saved to {pdf_path}")
 
 
@@ -155,16 +396,43 @@ def main():
     Main function to orchestrate the screenshot capture and key simulation process.
 
     This function:
-    1. Parses command-line arguments to get process parameters.
+    1. Parses command-line arguments to get process parameters, handing off to watch mode
+       or to the parallel worker pool if requested.
     2. If not in fullscreen mode, uses multiprocessing to allow the user to select a region of interest.
     3. Waits for 10 seconds before starting the main process.
-    4. Calls the function to simulate key presses and take screenshots.
-    5. Compiles all captured screenshots into a single PDF file.
+    4. Calls the function to simulate key presses and take screenshots, or to capture at a fixed frame rate.
+    5. Recompresses screenshots saved in a fast intermediate format, unless done in the background.
+    6. Compiles all captured screenshots into a single PDF file.
 
     Note:
         Multiprocessing is used for the ROI selection to handle potential GUI operations safely.
     """
-    repeat, save_directory, fullscreen = parse_arguments()
+    watch_arguments = parse_watch_arguments()
+    if watch_arguments:
+        directory, output_pdf, settle, polling = watch_arguments
+        print(f"Watching {directory}, press Ctrl+C to stop")
+        watch_images_to_pdf(directory, output_pdf, settle=settle, polling=polling)
+        print(f"PDF saved to {output_pdf}")
+        return
+
+    worker_arguments = parse_worker_arguments()
+    if worker_arguments:
+        jobs_file, workers, displays = worker_arguments
+        jobs = load_jobs(jobs_file)
+        if not jobs:
+            print(f"No jobs to run in {jobs_file}")
+            sys.exit(1)
+        results = run_worker_pool(jobs, workers, displays)
+        failed = sum(1 for pdf_path in results.values() if pdf_path is None) + len(jobs) - len(results)
+        print(f"Finished {len(jobs) - failed}/{len(jobs)} jobs")
+        sys.exit(1 if failed else 0)
+
+    (repeat, save_directory, fullscreen, store_directory,
+     intermediate, background, stitch_height, linearize, fps) = parse_arguments()
+    store = FrameStore(store_directory) if store_directory else None
+    recompress = needs_recompression(intermediate)
+    recompressor = BackgroundRecompressor() if recompress and background else None
+    stitcher = ScrollStitcher(stitch_height) if stitch_height else None
 
     roi = None
     if not fullscreen:
@@ -173,8 +441,20 @@ def main():
     
     print("Waiting 10 seconds before starting...")
     time.sleep(10)
-    simulate_keys_and_take_screenshots(repeat, save_directory, roi)
-    save_images_to_pdf_file(save_directory)
+    if fps:
+        saved_paths = capture_timed_screenshots(
+            repeat, fps, save_directory, roi, store, intermediate, recompressor
+        )
+    else:
+        saved_paths = simulate_keys_and_take_screenshots(
+            repeat, save_directory, roi, store, intermediate, recompressor, stitcher
+        )
+    if recompressor:
+        recompressor.close()
+    elif recompress:
+        print(f"Recompressing {len(saved_paths)} screenshots...")
+        recompress_images(saved_paths)
+    save_images_to_pdf_file(save_directory, store, linearize)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Optional
+from PIL import Image
+from service.pdf_writer import ImageStream
+
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+STREAM_EXTENSION = '.pdfimg'
+
+
+def frame_key(img: Image.Image) -> str:
+    """
+    Compute the content key of a frame from its raw pixel buffer.
+
+    Args:
+    img (Image.Image): The frame.
+
+    Returns:
+    str: A hex digest covering the mode, size, palette and pixels of the frame.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+    palette = img.getpalette()
+    if palette:
+        digest.update(bytes(palette))
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def file_key(path: str) -> str:
+    """
+    Compute the content key of an encoded image file from its bytes.
+
+    Args:
+    path (str): Path to the file.
+
+    Returns:
+    str: A hex digest of the file contents.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FrameStore:
+    """
+    Persistent content-addressed store of encoded frames and prepared PDF image streams.
+
+    Entries live as flat files named after their key in the store directory. The
+    modification time of each entry records its last use, so the least recently used
+    entries are evicted first once the store grows beyond max_bytes, across sessions.
+    One store may be shared by several encoder threads of a session.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        found = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self.entries[name] = size
+            self.total_bytes += size
+
+    def _touch(self, name: str) -> str:
+        path = os.path.join(self.directory, name)
+        self.entries.move_to_end(name)
+        os.utime(path)
+        return path
+
+    def _lookup(self, name: str) -> Optional[str]:
+        with self.lock:
+            if name not in self.entries:
+                return None
+            try:
+                return self._touch(name)
+            except FileNotFoundError:
+                # Removed behind our back, e.g. by another session evicting it
+                self.total_bytes -= self.entries.pop(name)
+                return None
+
+    def _add(self, name: str, temp_path: str) -> str:
+        path = os.path.join(self.directory, name)
+        with self.lock:
+            os.replace(temp_path, path)
+            self.total_bytes -= self.entries.pop(name, 0)
+            self.entries[name] = os.path.getsize(path)
+            self.total_bytes += self.entries[name]
+            self.evict()
+        return path
+
+    def _temp_path(self, name: str) -> str:
+        return os.path.join(self.directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def evict(self):
+        """
+        Remove least recently used entries until the store fits within max_bytes.
+        """
+        with self.lock:
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                name, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def get_frame(self, key: str, ext: str = '.png') -> Optional[str]:
+        """
+        Look up an encoded frame.
+
+        Args:
+        key (str): The frame key from frame_key.
+        ext (str): The file extension of the wanted encoding. Defaults to '.png'.
+
+        Returns:
+        Optional[str]: Path of the stored frame, or None if it is not in the store.
+        """
+        return self._lookup(key + ext.lower())
+
+    def put_frame(self, key: str, path: str) -> str:
+        """
+        Copy an encoded frame file into the store.
+
+        Args:
+        key (str): The frame key from frame_key.
+        path (str): Path of the encoded frame; its extension is kept.
+
+        Returns:
+        str: Path of the stored frame.
+        """
+        name = key + os.path.splitext(path)[1].lower()
+        temp_path = self._temp_path(name)
+        shutil.copyfile(path, temp_path)
+        return self._add(name, temp_path)
+
+    def get_image_stream(self, key: str) -> Optional[ImageStream]:
+        """
+        Load a prepared PDF image stream.
+
+        Args:
+        key (str): The file key from file_key.
+
+        Returns:
+        Optional[ImageStream]: The image stream, or None if it is not in the store.
+        """
+        path = self._lookup(key + STREAM_EXTENSION)
+        if not path:
+            return None
+        with open(path, 'rb') as file:
+            header = json.loads(file.readline())
+            return ImageStream(data=file.read(), **header)
+
+    def put_image_stream(self, key: str, stream: ImageStream) -> str:
+        """
+        Save a prepared PDF image stream.
+
+        Args:
+        key (str): The file key from file_key.
+        stream (ImageStream): The image stream.
+
+        Returns:
+        str: Path of the stored stream.
+        """
+        name = key + STREAM_EXTENSION
+        header = stream._asdict()
+        data = header.pop('data')
+        temp_path = self._temp_path(name)
+        with open(temp_path, 'wb') as file:
+            file.write(json.dumps(header).encode() + b'\n')
+            file.write(data)
+        return self._add(name, temp_path)
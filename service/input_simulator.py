@@ -1,7 +1,159 @@
-import pyautogui as pg # type: ignore
 import time
 import json
 import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+try:
+    import pyautogui as pg # type: ignore
+except ImportError:
+    raise
+except Exception:
+    # pyautogui connects to DISPLAY on import; modes that need no screen run without it
+    pg = None
+
+
+# pyautogui key names that differ from X keysym names
+XTEST_KEYSYMS = {
+    'pagedown': 'Next', 'pgdn': 'Next', 'pageup': 'Prior', 'pgup': 'Prior',
+    'enter': 'Return', 'return': 'Return', 'esc': 'Escape', 'escape': 'Escape',
+    'left': 'Left', 'right': 'Right', 'up': 'Up', 'down': 'Down',
+    'home': 'Home', 'end': 'End', 'space': 'space', ' ': 'space',
+    'tab': 'Tab', 'backspace': 'BackSpace', 'delete': 'Delete', 'del': 'Delete',
+    'insert': 'Insert', 'shift': 'Shift_L', 'ctrl': 'Control_L', 'alt': 'Alt_L',
+}
+
+
+class InputBackend(ABC):
+    """
+    Base class for key press backends.
+
+    Every press is timed from the call until it returns, and the durations are kept in
+    'latencies' (seconds). 'measures' says what that duration covers for the backend.
+    """
+    name = None
+    measures = 'press-to-delivery latency'
+
+    def __init__(self):
+        self.latencies: List[float] = []
+
+    def press(self, key: str):
+        start = time.perf_counter()
+        self._press(key)
+        self.latencies.append(time.perf_counter() - start)
+
+    @abstractmethod
+    def _press(self, key: str):
+        """
+        Send one key press and release.
+        """
+
+
+class PyAutoGUIBackend(InputBackend):
+    """
+    Key presses through pyautogui, including its global PAUSE and failsafe checks.
+
+    pyautogui does not report when the events reach the X server, and every call
+    sleeps for pyautogui.PAUSE, so only the duration of the call can be measured.
+    """
+    name = 'pyautogui'
+    measures = 'call duration (including pyautogui.PAUSE)'
+
+    def _press(self, key: str):
+        if pg is None:
+            raise RuntimeError("pyautogui could not connect to an X display; check DISPLAY")
+        pg.press(key)
+
+
+class XTestBackend(InputBackend):
+    """
+    Key presses injected directly with the X11 XTest extension through python-xlib.
+
+    There is no built-in pause: a press returns as soon as the X server has processed
+    the events, so all timing is left to the caller.
+    """
+    name = 'xtest'
+
+    def __init__(self, display_name: str = None):
+        super().__init__()
+        from Xlib import X, XK, display  # type: ignore
+        from Xlib.ext import xtest  # type: ignore
+        self.display = display.Display(display_name)
+        self.xtest = xtest
+        self.XK = XK
+        self.key_press = X.KeyPress
+        self.key_release = X.KeyRelease
+        self.keycodes: Dict[str, int] = {}
+
+    def keycode(self, key: str) -> int:
+        if key not in self.keycodes:
+            keysym = self.XK.string_to_keysym(XTEST_KEYSYMS.get(key.lower(), key))
+            keycode = self.display.keysym_to_keycode(keysym) if keysym else 0
+            if not keycode:
+                raise ValueError(f"No keycode for key '{key}'")
+            self.keycodes[key] = keycode
+        return self.keycodes[key]
+
+    def _press(self, key: str):
+        keycode = self.keycode(key)
+        self.xtest.fake_input(self.display, self.key_press, keycode)
+        self.xtest.fake_input(self.display, self.key_release, keycode)
+        # Round trip to the server so the press counts as delivered when this returns
+        self.display.sync()
+
+
+INPUT_BACKENDS = {
+    PyAutoGUIBackend.name: PyAutoGUIBackend,
+    XTestBackend.name: XTestBackend,
+}
+
+input_backend: InputBackend = PyAutoGUIBackend()
+
+
+def set_input_backend(name: str) -> InputBackend:
+    """
+    Select the backend used by simulate_key and simulate_with_config.
+
+    Args:
+    name (str): A key of INPUT_BACKENDS.
+
+    Returns:
+    InputBackend: The active backend. The current backend is kept if the requested
+                  one is unknown or cannot be initialised.
+    """
+    global input_backend
+    if name == input_backend.name:
+        return input_backend
+    if name not in INPUT_BACKENDS:
+        logging.error(f"Unknown input backend: {name}")
+        return input_backend
+    try:
+        input_backend = INPUT_BACKENDS[name]()
+    except Exception as e:
+        logging.error(f"Could not initialise input backend '{name}': {str(e)}")
+    return input_backend
+
+
+def input_latency_summary() -> Dict[str, float]:
+    """
+    Summarise the timed key presses of the active backend.
+
+    Returns:
+    dict: What the backend 'measures', the 'count' of presses and their 'mean', 'p50', 'p99'
+          and 'max' duration in milliseconds, or an empty dict if nothing was pressed yet.
+    """
+    latencies = sorted(input_backend.latencies)
+    if not latencies:
+        return {}
+    count = len(latencies)
+    return {
+        'measures': input_backend.measures,
+        'count': count,
+        'mean': 1000 * sum(latencies) / count,
+        'p50': 1000 * latencies[count // 2],
+        'p99': 1000 * latencies[min(count - 1, int(count * 0.99))],
+        'max': 1000 * latencies[-1],
+    }
 
 
 def input_simulator_health():
@@ -39,7 +191,7 @@ def simulate_with_config(config):
 
     for _ in range(repeat):
         time.sleep(delay_before)
-        pg.press(skey)
+        input_backend.press(skey)
         time.sleep(delay_after)
 
 
@@ -51,13 +203,13 @@ def simulate_key(key: str):
     key (str): The key to be pressed.
 
     The function checks if the input is a valid string and logs an error if it's not.
-    If valid, it simulates pressing the specified key.
+    If valid, it simulates pressing the specified key with the active input backend.
     """
     if not isinstance(key, str):
         logging.error("Input is not a valid string")
         return
 
-    pg.press(key)
+    input_backend.press(key)
 
 
 def simulate_page_up_down():
@@ -69,11 +221,11 @@ def simulate_page_up_down():
     """
     time.sleep(5) 
     # Simulate pressing Page Down
-    pg.press('pagedown')
+    input_backend.press('pagedown')
     time.sleep(1)  # Wait for 1 second
 
     # Simulate pressing Page Up
-    pg.press('pagedup')
+    input_backend.press('pagedup')
     time.sleep(1)  # Wait for 1 second
 
 
@@ -94,7 +246,7 @@ def parse_json_file(path: str):
         with open(path, 'r') as file:
             data = json.load(file)
         
-        valid_keys = ['skey', 'delay_before', 'delay_after', 'wait_event', 'repeat']
+        valid_keys = ['skey', 'delay_before', 'delay_after', 'wait_event', 'repeat', 'input_backend']
         parsed_data = {key: data[key] for key in valid_keys if key in data}
 
         return parsed_data
@@ -1,33 +1,109 @@
+import bisect
 import os
+import re
+import time
 from PIL import Image
 from reportlab.pdfgen import canvas # type: ignore
 from reportlab.lib.units import inch # type: ignore
+from service.pdf_writer import (
+    IncrementalPdfWriter, LinearizedPdfWriter, PdfWriter, encode_image_stream, prepare_passthrough_stream,
+    read_image_stream
+)
+from service.frame_store import file_key
+from service.watcher import Debouncer, create_watcher, is_image_complete
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+
+def natural_sort_key(path):
+    """
+    Build a sort key that orders numbers in file names by value, e.g. 'screenshot_2' before 'screenshot_10'.
+    
+    Args:
+    path (str): The file path.
+    
+    Returns:
+    list: The sort key.
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', os.path.basename(path))]
+
 
 def get_images_sorted_by_modification(directory):
     """
     Get a list of image files in the given directory, sorted by modification date.
     
+    Files saved within the same filesystem timestamp tick are ordered by name.
+    
     Args:
     directory (str): Path to the directory containing images.
     
     Returns:
     list: Sorted list of image file paths, ordered by last modification time.
     """
-    image_extensions = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
     image_files = [
         os.path.join(directory, f) for f in os.listdir(directory)
-        if f.lower().endswith(image_extensions)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
     ]
-    return sorted(image_files, key=os.path.getmtime)
+    return sorted(image_files, key=image_sort_key)
+
+
+def image_sort_key(path):
+    """
+    Build the sort key ordering images by modification time, then by name.
+    
+    Args:
+    path (str): The file path.
+    
+    Returns:
+    tuple: The sort key.
+    """
+    return os.path.getmtime(path), natural_sort_key(path)
+
+
+def load_image_stream(img_path, store=None):
+    """
+    Load an image file as a PDF image stream, reusing a prepared stream from the store.
+
+    JPEG and PNG data embedded as is is cheaper to parse again than to look up, so only
+    streams that had to be decoded and recompressed are kept in the store.
+
+    Args:
+    img_path (str): Path to the image file.
+    store (FrameStore, optional): Frame store holding prepared image streams.
+
+    Returns:
+    ImageStream: The image stream.
+    """
+    if store is None:
+        return read_image_stream(img_path)
+
+    with open(img_path, 'rb') as file:
+        stream = prepare_passthrough_stream(file.read())
+    if stream is not None:
+        return stream
+
+    key = file_key(img_path)
+    stream = store.get_image_stream(key)
+    if stream is None:
+        with Image.open(img_path) as img:
+            stream = encode_image_stream(img)
+        store.put_image_stream(key, stream)
+    return stream
 
 
-def save_images_to_pdf(directory, output_pdf='output.pdf'):
+def save_images_to_pdf(directory, output_pdf='output.pdf', passthrough=True, store=None, linearize=False):
     """
     Save all images in the given directory to a single PDF file.
     
     Args:
     directory (str): Path to the directory containing images.
     output_pdf (str): Name of the output PDF file. Defaults to 'output.pdf'.
+    passthrough (bool): Embed JPEG and PNG data as is instead of decoding and
+                        recompressing it through reportlab. Defaults to True.
+    store (FrameStore, optional): Frame store to reuse prepared image streams from.
+                                  Only used with passthrough.
+    linearize (bool): Write a linearized ("fast web view") PDF so remote readers can show
+                      the first page before the whole file is downloaded. Only used with
+                      passthrough. Defaults to False.
     
     Returns:
     str: Path to the created PDF file.
@@ -37,6 +113,13 @@ def save_images_to_pdf(directory, output_pdf='output.pdf'):
     if not image_files:
         print(f"No image files found in {directory}")
         return None
+
+    if passthrough:
+        writer_class = LinearizedPdfWriter if linearize else PdfWriter
+        with writer_class(output_pdf) as writer:
+            for img_path in image_files:
+                writer.add_image_page(load_image_stream(img_path, store))
+        return output_pdf
     
     c = canvas.Canvas(output_pdf)
     
@@ -54,6 +137,82 @@ def save_images_to_pdf(directory, output_pdf='output.pdf'):
     return output_pdf
 
 
+def watch_images_to_pdf(directory, output_pdf='output.pdf', settle=2.0, idle_timeout=None,
+                        poll_interval=0.5, polling=False, store=None):
+    """
+    Keep a PDF of the images in a directory current while new images land in it.
+    
+    Images already in the directory are added first. After that, only new images are
+    processed: a file is added once it has not changed for 'settle' seconds and holds a
+    complete image, so partially written or still syncing files are skipped until they
+    are done. Each batch of new images is added to the PDF as an incremental update.
+    Pages keep the order of a full rebuild, by modification time: an image that completes
+    after newer ones, like a slow sync of an older file, is inserted at its place.
+    
+    Args:
+    directory (str): Path to the directory to watch.
+    output_pdf (str): Path of the PDF file to keep updated. Defaults to 'output.pdf'.
+    settle (float): Seconds a file must stay unchanged before it is added. Defaults to 2.
+    idle_timeout (float, optional): Stop after this many seconds without new files.
+                                    If None, watch until interrupted.
+    poll_interval (float): Longest wait between checks. Defaults to 0.5 seconds.
+    polling (bool): Poll the directory instead of using inotify.
+    store (FrameStore, optional): Frame store to reuse prepared image streams from.
+    
+    Returns:
+    str: Path to the PDF file.
+    """
+    watcher = create_watcher(directory, polling)
+    debouncer = Debouncer(settle)
+    writer = IncrementalPdfWriter(output_pdf)
+    added = set()
+    # Sort keys of the pages in the PDF, in page order
+    page_keys = []
+
+    def add_images(paths):
+        complete = [path for path in paths if path not in added and is_image_complete(path)]
+        for path in sorted(complete, key=image_sort_key):
+            key = image_sort_key(path)
+            position = bisect.bisect_right(page_keys, key)
+            writer.add_image_page(load_image_stream(path, store), position)
+            page_keys.insert(position, key)
+            added.add(path)
+        if complete:
+            writer.commit()
+            print(f"Added {len(complete)} images to {output_pdf} ({len(added)} pages)")
+        return complete
+
+    existing = get_images_sorted_by_modification(directory)
+    complete = add_images(existing)
+    # Check again files that were still being written when the watch started
+    debouncer.touch({os.path.basename(path) for path in existing if path not in complete})
+    last_activity = time.monotonic()
+
+    try:
+        while True:
+            deadline = debouncer.next_deadline()
+            timeout = poll_interval if deadline is None else min(deadline, poll_interval)
+            changed = {name for name in watcher.changes(timeout) if name.lower().endswith(IMAGE_EXTENSIONS)}
+            if changed:
+                debouncer.touch(changed)
+                last_activity = time.monotonic()
+
+            # Files still incomplete once settled are picked up again by their next change
+            settled = debouncer.settled()
+            if settled:
+                add_images([os.path.join(directory, name) for name in settled])
+
+            if idle_timeout is not None and not debouncer.pending and time.monotonic() - last_activity >= idle_timeout:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        writer.close()
+
+    return output_pdf
+
+
 def append_images_to_pdf(directory, existing_pdf):
     """
     Append images from the given directory to an existing PDF file.
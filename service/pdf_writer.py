@@ -0,0 +1,836 @@
+import struct
+import tempfile
+import zlib
+from typing import List, NamedTuple, Optional, Tuple
+from PIL import Image
+
+
+PDF_HEADER = b'%PDF-1.5\n%\xe2\xe3\xcf\xd3\n'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# SOFn markers that carry frame dimensions (DHT, JPG and DAC share the range but are not frames)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+
+
+class ImageStream(NamedTuple):
+    """
+    An image XObject ready to be written into a PDF.
+
+    Attributes:
+    width (int): Image width in pixels.
+    height (int): Image height in pixels.
+    color_space (str): PDF colour space, e.g. '/DeviceRGB' or an '/Indexed' array.
+    bits_per_component (int): Bits per colour component.
+    filter (str): PDF stream filter, '/DCTDecode' or '/FlateDecode'.
+    decode_parms (Optional[str]): PDF DecodeParms dictionary, or None.
+    data (bytes): The encoded stream data.
+    """
+    width: int
+    height: int
+    color_space: str
+    bits_per_component: int
+    filter: str
+    decode_parms: Optional[str]
+    data: bytes
+
+
+def prepare_jpeg_stream(data: bytes) -> Optional[ImageStream]:
+    """
+    Wrap raw JPEG bytes as a DCTDecode image stream without decoding them.
+
+    Args:
+    data (bytes): The contents of a JPEG file.
+
+    Returns:
+    Optional[ImageStream]: The image stream, or None if the JPEG cannot be embedded as is
+                           (CMYK, 12-bit, or malformed data).
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            pos += 2
+            continue
+
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 10 > len(data):
+                return None
+            precision, height, width, components = struct.unpack('>BHHB', data[pos + 4:pos + 10])
+            color_spaces = {1: '/DeviceGray', 3: '/DeviceRGB'}
+            if precision != 8 or components not in color_spaces or width == 0 or height == 0:
+                return None
+            return ImageStream(width, height, color_spaces[components], 8, '/DCTDecode', None, data)
+        if marker == 0xDA:
+            # Start of scan reached without a frame header
+            return None
+        pos += 2 + length
+
+    return None
+
+
+def prepare_png_stream(data: bytes) -> Optional[ImageStream]:
+    """
+    Wrap the IDAT data of a PNG as a FlateDecode image stream without decoding it.
+
+    The zlib stream inside a PNG is already a valid FlateDecode stream once the PNG
+    predictor parameters are declared, so the compressed bytes are copied as is.
+
+    Args:
+    data (bytes): The contents of a PNG file.
+
+    Returns:
+    Optional[ImageStream]: The image stream, or None if the PNG has alpha, transparency
+                           or interlacing and has to be decoded instead.
+    """
+    if data[:8] != PNG_SIGNATURE:
+        return None
+
+    pos = 8
+    header = None
+    palette = None
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif chunk_type == b'PLTE':
+            palette = chunk
+        elif chunk_type == b'tRNS':
+            return None
+        elif chunk_type == b'IDAT':
+            idat.append(chunk)
+        elif chunk_type == b'IEND':
+            break
+
+    if header is None or not idat:
+        return None
+
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if interlace != 0:
+        return None
+
+    if color_type == 0:
+        color_space, colors = '/DeviceGray', 1
+    elif color_type == 2:
+        color_space, colors = '/DeviceRGB', 3
+    elif color_type == 3 and palette:
+        color_space = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+        colors = 1
+    else:
+        # Grey+alpha, RGBA, or a palette image without PLTE
+        return None
+
+    decode_parms = (
+        f"<< /Predictor 15 /Colors {colors} /BitsPerComponent {bit_depth} /Columns {width} >>"
+    )
+    return ImageStream(width, height, color_space, bit_depth, '/FlateDecode', decode_parms, b''.join(idat))
+
+
+def encode_image_stream(img: Image.Image) -> ImageStream:
+    """
+    Decode a PIL image to raw pixels and compress them as a FlateDecode image stream.
+
+    Alpha is dropped, matching how reportlab draws images without a mask.
+
+    Args:
+    img (Image.Image): The image to encode.
+
+    Returns:
+    ImageStream: The image stream.
+    """
+    if img.mode in ('1', 'L'):
+        img = img.convert('L')
+        color_space = '/DeviceGray'
+    else:
+        img = img.convert('RGB')
+        color_space = '/DeviceRGB'
+
+    width, height = img.size
+    return ImageStream(width, height, color_space, 8, '/FlateDecode', None, zlib.compress(img.tobytes()))
+
+
+def prepare_passthrough_stream(data: bytes) -> Optional[ImageStream]:
+    """
+    Wrap JPEG or PNG file data as a PDF image stream without re-encoding it.
+
+    Args:
+    data (bytes): The image file contents.
+
+    Returns:
+    Optional[ImageStream]: The image stream, or None if the image has to be decoded.
+    """
+    if data[:2] == b'\xff\xd8':
+        return prepare_jpeg_stream(data)
+    if data[:8] == PNG_SIGNATURE:
+        return prepare_png_stream(data)
+    return None
+
+
+def read_image_stream(path: str) -> ImageStream:
+    """
+    Load an image file as a PDF image stream, embedding JPEG and PNG data without
+    re-encoding whenever possible.
+
+    Args:
+    path (str): Path to the image file.
+
+    Returns:
+    ImageStream: The image stream.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    stream = prepare_passthrough_stream(data)
+    if stream is None:
+        with Image.open(path) as img:
+            stream = encode_image_stream(img)
+    return stream
+
+
+def image_dictionary(image: ImageStream) -> bytes:
+    """
+    Build the dictionary of an image XObject, without /Length.
+    """
+    parts = [
+        '<< /Type /XObject /Subtype /Image',
+        f'/Width {image.width} /Height {image.height}',
+        f'/ColorSpace {image.color_space} /BitsPerComponent {image.bits_per_component}',
+        f'/Filter {image.filter}',
+    ]
+    if image.decode_parms:
+        parts.append(f'/DecodeParms {image.decode_parms}')
+    return ' '.join(parts).encode('latin-1') + b' >>'
+
+
+def page_content(image: ImageStream) -> bytes:
+    """
+    Build the content stream that scales the page's image to fill the page.
+    """
+    return b'q %d 0 0 %d 0 0 cm /Im0 Do Q' % (image.width, image.height)
+
+
+def page_dictionary(image: ImageStream, parent_ref: int, image_ref: int, content_ref: int) -> bytes:
+    """
+    Build the dictionary of a page sized to its image, in points.
+    """
+    return (
+        f'<< /Type /Page /Parent {parent_ref} 0 R /MediaBox [0 0 {image.width} {image.height}] '
+        f'/Resources << /XObject << /Im0 {image_ref} 0 R >> >> /Contents {content_ref} 0 R >>'
+    ).encode('latin-1')
+
+
+def stream_object_parts(number: int, body: bytes, length: int) -> Tuple[bytes, bytes]:
+    """
+    Build the bytes that go before and after the data of a stream object.
+
+    Args:
+    number (int): The object number.
+    body (bytes): The stream dictionary without /Length.
+    length (int): The length of the stream data.
+
+    Returns:
+    Tuple[bytes, bytes]: The object header up to 'stream' and the trailing 'endstream endobj'.
+    """
+    return b'%d 0 obj\n' % number + body[:-2] + b' /Length %d >>\nstream\n' % length, b'\nendstream\nendobj\n'
+
+
+def serialize_object(number: int, body: bytes, stream: Optional[bytes] = None) -> bytes:
+    """
+    Serialize an indirect object, optionally followed by its stream data.
+
+    Args:
+    number (int): The object number.
+    body (bytes): The object body; for streams, the dictionary without /Length.
+    stream (Optional[bytes]): The stream data, or None for a plain object.
+
+    Returns:
+    bytes: The object.
+    """
+    if stream is None:
+        return b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    head, tail = stream_object_parts(number, body, len(stream))
+    return head + stream + tail
+
+
+class PdfWriter:
+    """
+    Minimal streaming PDF writer that places one image per page.
+
+    Objects are written to disk as soon as a page is added, so memory use does not
+    grow with the number of pages. Object 1 is the catalog and object 2 the page tree;
+    both are written when the writer is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.offsets = {}
+        self.page_refs = []
+        self.next_object = 3
+        self.file.write(PDF_HEADER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def allocate_object(self) -> int:
+        number = self.next_object
+        self.next_object += 1
+        return number
+
+    def write_object(self, number: int, body: bytes, stream: Optional[bytes] = None):
+        """
+        Write an indirect object, optionally followed by its stream data.
+
+        Args:
+        number (int): The object number.
+        body (bytes): The object body; for streams, the dictionary without /Length.
+        stream (Optional[bytes]): The stream data, or None for a plain object.
+        """
+        self.offsets[number] = self.file.tell()
+        if stream is None:
+            self.file.write(serialize_object(number, body))
+        else:
+            head, tail = stream_object_parts(number, body, len(stream))
+            self.file.write(head)
+            self.file.write(stream)
+            self.file.write(tail)
+
+    def add_image_page(self, image: ImageStream):
+        """
+        Add a page sized to the image, in points, with the image filling it.
+
+        Args:
+        image (ImageStream): The image to place on the page.
+        """
+        image_ref = self.allocate_object()
+        content_ref = self.allocate_object()
+        page_ref = self.allocate_object()
+
+        self.write_object(image_ref, image_dictionary(image), image.data)
+        self.write_object(content_ref, b'<< >>', page_content(image))
+        self.write_object(page_ref, page_dictionary(image, 2, image_ref, content_ref))
+        self.page_refs.append(page_ref)
+
+    def close(self):
+        """
+        Write the page tree, catalog, cross-reference table and trailer, then close the file.
+        """
+        kids = ' '.join(f'{ref} 0 R' for ref in self.page_refs)
+        self.write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_refs)} >>'.encode('latin-1'))
+        self.write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = self.file.tell()
+        size = self.next_object
+        self.file.write(b'xref\n0 %d\n' % size)
+        self.file.write(b'0000000000 65535 f \n')
+        for number in range(1, size):
+            self.file.write(b'%010d 00000 n \n' % self.offsets[number])
+        self.file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset))
+        self.file.close()
+
+
+class IncrementalPdfWriter(PdfWriter):
+    """
+    PDF writer that keeps the file a complete, valid PDF after every commit.
+
+    Each commit appends the pages added since the previous one, the page tree nodes they
+    changed and a cross-reference section pointing back to the previous one, as a PDF
+    incremental update. Earlier bytes of the file are never rewritten.
+
+    The page tree is kept balanced like a B+ tree, so a commit only rewrites the nodes on
+    the paths from the new pages to the root, and each update stays small however many
+    pages the file already holds. Pages are usually appended, which fills the tree left to
+    right; a page inserted before others splits the node it lands in, moving half of its
+    kids to a new sibling. Object 2 is the first leaf; the catalog is rewritten whenever
+    the tree grows a new root.
+    """
+
+    def __init__(self, path: str, page_tree_fanout: int = 32):
+        super().__init__(path)
+        self.page_tree_fanout = page_tree_fanout
+        self.root = {'ref': 2, 'parent': None, 'kids': [], 'count': 0}
+        # Pages and page tree nodes to write with the next commit, by object number
+        self.changed = {2: self.root}
+        self.root_changed = True
+        self.previous_xref = None
+        self.commit()
+
+    def add_image_page(self, image: ImageStream, position: Optional[int] = None):
+        """
+        Add a page sized to the image, in points, with the image filling it.
+
+        Args:
+        image (ImageStream): The image to place on the page.
+        position (Optional[int]): Index the page is inserted at. Defaults to the end.
+
+        Raises:
+        IndexError: If the position is outside the document.
+        """
+        if position is None:
+            position = self.root['count']
+        if not 0 <= position <= self.root['count']:
+            raise IndexError(f"Page position {position} is outside a document of {self.root['count']} pages")
+
+        image_ref = self.allocate_object()
+        content_ref = self.allocate_object()
+        page_ref = self.allocate_object()
+
+        self.write_object(image_ref, image_dictionary(image), image.data)
+        self.write_object(content_ref, b'<< >>', page_content(image))
+        # The page dictionary is written on commit, once its parent is final
+        page = {'ref': page_ref, 'parent': None, 'count': 1, 'image': image._replace(data=b''),
+                'image_ref': image_ref, 'content_ref': content_ref}
+        self._insert_page(page, position)
+        self.page_refs.insert(position, page_ref)
+
+    def _insert_page(self, page: dict, position: int):
+        node = self.root
+        rightmost = True
+        while node['kids'] and 'kids' in node['kids'][0]:
+            node['count'] += 1
+            self.changed[node['ref']] = node
+            for index, kid in enumerate(node['kids']):
+                if position <= kid['count'] or index == len(node['kids']) - 1:
+                    break
+                position -= kid['count']
+            rightmost = rightmost and index == len(node['kids']) - 1
+            node = kid
+
+        node['kids'].insert(position, page)
+        node['count'] += 1
+        page['parent'] = node
+        self.changed[node['ref']] = node
+        self.changed[page['ref']] = page
+
+        # Appending opens a new rightmost node instead of halving the full one
+        appended = rightmost and position == len(node['kids']) - 1
+        while len(node['kids']) > self.page_tree_fanout:
+            node = self._split_node(node, appended)
+
+    def _split_node(self, node: dict, appended: bool) -> dict:
+        """
+        Move the last kid, or the second half of the kids, of an overfull node to a new sibling.
+
+        Returns:
+        dict: The parent of the node, which has gained the sibling.
+        """
+        keep = len(node['kids']) - 1 if appended else len(node['kids']) // 2
+        sibling = {'ref': self.allocate_object(), 'parent': node['parent'], 'kids': node['kids'][keep:]}
+        sibling['count'] = sum(kid['count'] for kid in sibling['kids'])
+        node['kids'] = node['kids'][:keep]
+        node['count'] -= sibling['count']
+        for kid in sibling['kids']:
+            kid['parent'] = sibling
+            self.changed[kid['ref']] = kid
+        self.changed[node['ref']] = node
+        self.changed[sibling['ref']] = sibling
+
+        parent = node['parent']
+        if parent is None:
+            # The root was split: grow the tree by one level above it
+            parent = {'ref': self.allocate_object(), 'parent': None, 'kids': [node],
+                      'count': node['count'] + sibling['count']}
+            node['parent'] = sibling['parent'] = parent
+            self.root = parent
+            self.root_changed = True
+            self.changed[parent['ref']] = parent
+        parent['kids'].insert(parent['kids'].index(node) + 1, sibling)
+        return parent
+
+    def _write_entry(self, entry: dict):
+        parent_ref = entry['parent']['ref'] if entry['parent'] else None
+        if 'kids' not in entry:
+            self.write_object(entry['ref'], page_dictionary(entry['image'], parent_ref, entry['image_ref'], entry['content_ref']))
+            return
+        kids = ' '.join(f'{kid["ref"]} 0 R' for kid in entry['kids'])
+        body = f'<< /Type /Pages /Kids [{kids}] /Count {entry["count"]}'
+        if parent_ref:
+            body += f' /Parent {parent_ref} 0 R'
+        self.write_object(entry['ref'], (body + ' >>').encode('latin-1'))
+
+    def commit(self):
+        """
+        Append the changed pages and page tree nodes and a cross-reference section so the
+        file is readable as is.
+        """
+        for ref in sorted(self.changed):
+            self._write_entry(self.changed[ref])
+        self.changed = {}
+        if self.root_changed:
+            self.write_object(1, b'<< /Type /Catalog /Pages %d 0 R >>' % self.root['ref'])
+            self.root_changed = False
+
+        xref_offset = self.file.tell()
+        # Every section repeats the head of the free list, which some readers expect to find
+        self.file.write(b'xref\n0 1\n0000000000 65535 f \n')
+        numbers = sorted(self.offsets)
+        start = 0
+        while start < len(numbers):
+            end = start
+            while end + 1 < len(numbers) and numbers[end + 1] == numbers[end] + 1:
+                end += 1
+            self.file.write(b'%d %d\n' % (numbers[start], end - start + 1))
+            for number in numbers[start:end + 1]:
+                self.file.write(b'%010d 00000 n \n' % self.offsets[number])
+            start = end + 1
+
+        trailer = b'<< /Size %d /Root 1 0 R' % self.next_object
+        if self.previous_xref is not None:
+            trailer += b' /Prev %d' % self.previous_xref
+        self.file.write(b'trailer\n' + trailer + b' >>\nstartxref\n%d\n%%%%EOF\n' % xref_offset)
+        self.file.flush()
+        self.previous_xref = xref_offset
+        self.offsets = {}
+
+    def close(self):
+        """
+        Commit any pages added since the last commit, then close the file.
+        """
+        if self.offsets or self.changed:
+            self.commit()
+        self.file.close()
+
+
+class BitWriter:
+    """
+    Big-endian bit packer for linearization hint tables.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.value = 0
+        self.bits = 0
+
+    def write(self, value: int, bits: int):
+        self.value = (self.value << bits) | value
+        self.bits += bits
+        while self.bits >= 8:
+            self.bits -= 8
+            self.data.append((self.value >> self.bits) & 0xFF)
+        self.value &= (1 << self.bits) - 1
+
+    def pad(self):
+        """
+        Fill the current byte with zero bits.
+        """
+        if self.bits:
+            self.write(0, 8 - self.bits)
+
+    def write_items(self, values: List[int], bits: int):
+        """
+        Write one hint table item for every page, then pad to a byte boundary.
+        """
+        for value in values:
+            self.write(value, bits)
+        self.pad()
+
+
+def hint_stream_data(
+        first_page_offset: int,
+        page_objects: List[int],
+        page_lengths: List[int],
+        content_offsets: List[int],
+        content_lengths: List[int]
+    ) -> Tuple[bytes, int]:
+    """
+    Build the page offset and shared object hint tables of a linearized PDF.
+
+    Pages share no objects, so the shared object hint table is empty.
+
+    Args:
+    first_page_offset (int): Offset of the first page object, ignoring the hint stream.
+    page_objects (List[int]): Number of objects of each page.
+    page_lengths (List[int]): Length in bytes of each page's objects.
+    content_offsets (List[int]): Offset of each page's content stream from the start of the page.
+    content_lengths (List[int]): Length in bytes of each page's content stream object.
+
+    Returns:
+    Tuple[bytes, int]: The hint stream data and the offset of the shared object hint table in it.
+    """
+    least_objects, least_length = min(page_objects), min(page_lengths)
+    least_content_offset, least_content_length = min(content_offsets), min(content_lengths)
+    object_bits = (max(page_objects) - least_objects).bit_length()
+    length_bits = (max(page_lengths) - least_length).bit_length()
+    content_offset_bits = (max(content_offsets) - least_content_offset).bit_length()
+    content_length_bits = (max(content_lengths) - least_content_length).bit_length()
+
+    page_table = struct.pack(
+        '>IIHIHIHIHHHHH',
+        least_objects, first_page_offset, object_bits, least_length, length_bits,
+        least_content_offset, content_offset_bits, least_content_length, content_length_bits,
+        0, 0, 0, 1
+    )
+    bits = BitWriter()
+    bits.write_items([count - least_objects for count in page_objects], object_bits)
+    bits.write_items([length - least_length for length in page_lengths], length_bits)
+    # No page references shared objects: items 3 to 5 are empty
+    bits.write_items([0] * len(page_objects), 0)
+    bits.write_items([offset - least_content_offset for offset in content_offsets], content_offset_bits)
+    bits.write_items([length - least_content_length for length in content_lengths], content_length_bits)
+    page_table += bytes(bits.data)
+
+    shared_table = struct.pack('>IIIIHIH', 0, 0, 0, 0, 0, 0, 0)
+    return page_table + shared_table, len(page_table)
+
+
+def build_page_tree(page_count: int, fanout: int) -> List[Tuple[List[Tuple[str, int]], int]]:
+    """
+    Build a balanced page tree.
+
+    Args:
+    page_count (int): Number of pages.
+    fanout (int): Maximum number of kids per page tree node.
+
+    Returns:
+    List[Tuple[List[Tuple[str, int]], int]]: The nodes as (kids, page count) pairs, root last.
+                                             Kids are ('page', page index) or ('node', node index).
+    """
+    nodes = []
+    level = [('page', index, 1) for index in range(page_count)]
+    while True:
+        next_level = []
+        for start in range(0, len(level), fanout):
+            group = level[start:start + fanout]
+            nodes.append(([(kind, index) for kind, index, _ in group], sum(count for _, _, count in group)))
+            next_level.append(('node', len(nodes) - 1, nodes[-1][1]))
+        if len(next_level) == 1:
+            return nodes
+        level = next_level
+
+
+class LinearizedPdfWriter:
+    """
+    PDF writer producing a linearized ("fast web view") file, one image per page.
+
+    Image data is spooled to a temporary file as pages are added, and the file is laid
+    out when the writer is closed: first the linearization dictionary, a first-page
+    cross-reference stream, the catalog, the hint stream and the first page, so a
+    remote reader can show page one after fetching only that prefix. The remaining
+    pages follow, then an object stream packing the page tree nodes and a compressed
+    main cross-reference stream.
+
+    Content streams and images are streams, which may not be stored in an object stream.
+    That leaves one small page dictionary per page, which would need an object stream of
+    its own to stay within its page's section, costing more bytes than it saves; qpdf
+    likewise leaves page dictionaries at the top level of the linearized files it writes.
+    """
+
+    def __init__(self, path: str, page_tree_fanout: int = 32):
+        self.path = path
+        self.page_tree_fanout = page_tree_fanout
+        self.spool = tempfile.TemporaryFile()
+        self.pages: List[Tuple[ImageStream, int, int]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.spool.close()
+
+    def add_image_page(self, image: ImageStream):
+        """
+        Add a page sized to the image, in points, with the image filling it.
+
+        Args:
+        image (ImageStream): The image to place on the page.
+        """
+        offset = self.spool.tell()
+        self.spool.write(image.data)
+        self.pages.append((image._replace(data=b''), offset, len(image.data)))
+
+    def close(self):
+        """
+        Lay out and write the linearized file.
+
+        Raises:
+        ValueError: If no page was added.
+        """
+        try:
+            if not self.pages:
+                raise ValueError("A linearized PDF needs at least one page")
+            self._write()
+        finally:
+            self.spool.close()
+
+    def _write(self):
+        page_count = len(self.pages)
+        nodes = build_page_tree(page_count, self.page_tree_fanout)
+
+        # Remaining pages, the object stream, the main xref stream and the compressed page tree
+        # nodes are numbered first; the first-page section gets the highest numbers, as
+        # linearization requires. Compressed objects must come after uncompressed ones.
+        object_stream_ref = 3 * (page_count - 1) + 1
+        main_xref_ref = object_stream_ref + 1
+        node_base = main_xref_ref + 1
+        last_main_ref = node_base + len(nodes) - 1
+        linearization_ref, first_xref_ref, catalog_ref, hint_ref = range(last_main_ref + 1, last_main_ref + 5)
+        size = hint_ref + 4
+
+        def page_refs(index):
+            if index == 0:
+                return hint_ref + 1, hint_ref + 2, hint_ref + 3
+            base = 3 * (index - 1)
+            return base + 1, base + 2, base + 3
+
+        parents = {}
+        node_bodies = []
+        for node_index, (kids, count) in enumerate(nodes):
+            refs = []
+            for kind, index in kids:
+                if kind == 'page':
+                    parents[index] = node_base + node_index
+                    refs.append(page_refs(index)[0])
+                else:
+                    parents[('node', index)] = node_base + node_index
+                    refs.append(node_base + index)
+            node_bodies.append((refs, count))
+
+        # Each page is its page dictionary, content stream and image, in that order. Only the
+        # dictionary could go in an object stream, and one per page would not pay for itself.
+        page_parts = []
+        for index, (image, _, length) in enumerate(self.pages):
+            page_ref, content_ref, image_ref = page_refs(index)
+            page_object = serialize_object(page_ref, page_dictionary(image, parents[index], image_ref, content_ref))
+            content_object = serialize_object(content_ref, b'<< >>', page_content(image))
+            image_head, image_tail = stream_object_parts(image_ref, image_dictionary(image), length)
+            page_parts.append((page_object, content_object, image_head, image_tail))
+        page_lengths = [
+            len(page_object) + len(content_object) + len(image_head) + self.pages[index][2] + len(image_tail)
+            for index, (page_object, content_object, image_head, image_tail) in enumerate(page_parts)
+        ]
+
+        # Offsets need 4 bytes unless the file may exceed 4 GiB
+        upper_bound = self.spool.tell() + sum(page_lengths) + 4096 * (len(nodes) + 16)
+        offset_width = 4 if upper_bound < 2 ** 32 else 8
+
+        catalog = serialize_object(catalog_ref, b'<< /Type /Catalog /Pages %d 0 R >>' % (node_base + len(nodes) - 1))
+        linearization_length = 200
+        first_xref_entries = 7
+        first_xref_data_length = first_xref_entries * (1 + offset_width + 2)
+        first_xref_head_length = 240
+
+        first_xref_offset = len(PDF_HEADER) + linearization_length
+        catalog_offset = first_xref_offset + first_xref_head_length + first_xref_data_length + len(b'\nendstream\nendobj\n')
+        hint_offset = catalog_offset + len(catalog)
+
+        # Hint table offsets are given as if the hint stream were absent
+        content_offsets = [len(parts[0]) for parts in page_parts]
+        content_lengths = [len(parts[1]) for parts in page_parts]
+        hint_data, shared_offset = hint_stream_data(hint_offset, [3] * page_count, page_lengths, content_offsets, content_lengths)
+        hint = serialize_object(hint_ref, b'<< /Filter /FlateDecode /S %d >>' % shared_offset, zlib.compress(hint_data))
+
+        first_page_offset = hint_offset + len(hint)
+        first_page_end = first_page_offset + page_lengths[0]
+        page_offsets = [first_page_offset]
+        for length in page_lengths[:-1]:
+            page_offsets.append(page_offsets[-1] + length)
+
+        object_header = []
+        object_data = b''
+        for node_index, (refs, count) in enumerate(node_bodies):
+            kids = ' '.join(f'{ref} 0 R' for ref in refs)
+            body = f'<< /Type /Pages /Kids [{kids}] /Count {count}'
+            parent = parents.get(('node', node_index))
+            if parent:
+                body += f' /Parent {parent} 0 R'
+            object_header.append(f'{node_base + node_index} {len(object_data)}')
+            object_data += (body + ' >>\n').encode('latin-1')
+        header = (' '.join(object_header) + '\n').encode('latin-1')
+        object_stream = serialize_object(
+            object_stream_ref,
+            b'<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode >>' % (len(nodes), len(header)),
+            zlib.compress(header + object_data)
+        )
+        object_stream_offset = page_offsets[-1] + page_lengths[-1]
+        main_xref_offset = object_stream_offset + len(object_stream)
+
+        def entry(kind, field, index=0):
+            return bytes([kind]) + field.to_bytes(offset_width, 'big') + index.to_bytes(2, 'big')
+
+        main_entries = [entry(0, 0, 65535)]
+        for index in range(1, page_count):
+            offset = page_offsets[index]
+            page_object, content_object = page_parts[index][:2]
+            main_entries += [
+                entry(1, offset),
+                entry(1, offset + len(page_object)),
+                entry(1, offset + len(page_object) + len(content_object)),
+            ]
+        main_entries += [entry(1, object_stream_offset), entry(1, main_xref_offset)]
+        main_entries += [entry(2, object_stream_ref, index) for index in range(len(nodes))]
+        main_xref = serialize_object(
+            main_xref_ref,
+            b'<< /Type /XRef /Size %d /Index [0 %d] /W [1 %d 2] /Filter /FlateDecode >>'
+            % (size, last_main_ref + 1, offset_width),
+            zlib.compress(b''.join(main_entries))
+        )
+        trailer = b'startxref\n%d\n%%%%EOF\n' % first_xref_offset
+        file_length = main_xref_offset + len(main_xref) + len(trailer)
+
+        first_page_object, first_content_object = page_parts[0][:2]
+        first_entries = b''.join([
+            entry(1, len(PDF_HEADER)),
+            entry(1, first_xref_offset),
+            entry(1, catalog_offset),
+            entry(1, hint_offset),
+            entry(1, first_page_offset),
+            entry(1, first_page_offset + len(first_page_object)),
+            entry(1, first_page_offset + len(first_page_object) + len(first_content_object)),
+        ])
+        first_xref_head = (
+            b'%d 0 obj\n<< /Type /XRef /Size %d /Index [%d %d] /W [1 %d 2] /Root %d 0 R /Prev %d /Length %d >>'
+            % (first_xref_ref, size, linearization_ref, first_xref_entries, offset_width,
+               catalog_ref, main_xref_offset, first_xref_data_length)
+        ).ljust(first_xref_head_length - len(b'\nstream\n')) + b'\nstream\n'
+        linearization = (
+            b'%d 0 obj\n<< /Linearized 1 /L %d /H [%d %d] /O %d /E %d /N %d /T %d >>'
+            % (linearization_ref, file_length, hint_offset, len(hint), page_refs(0)[0],
+               first_page_end, page_count, main_xref_offset)
+        ).ljust(linearization_length - len(b'\nendobj\n')) + b'\nendobj\n'
+
+        with open(self.path, 'wb') as file:
+            file.write(PDF_HEADER)
+            file.write(linearization)
+            file.write(first_xref_head + first_entries + b'\nendstream\nendobj\n')
+            file.write(catalog)
+            file.write(hint)
+            for index, (page_object, content_object, image_head, image_tail) in enumerate(page_parts):
+                file.write(page_object)
+                file.write(content_object)
+                file.write(image_head)
+                self._copy_image(file, index)
+                file.write(image_tail)
+            file.write(object_stream)
+            file.write(main_xref)
+            file.write(trailer)
+
+    def _copy_image(self, file, index: int):
+        _, offset, length = self.pages[index]
+        self.spool.seek(offset)
+        while length:
+            block = self.spool.read(min(length, 1024 * 1024))
+            file.write(block)
+            length -= len(block)
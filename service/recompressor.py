@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from PIL import Image
+
+
+# Capture-time formats: (file extension, Pillow save parameters)
+INTERMEDIATE_FORMATS = {
+    'png': ('.png', {}),
+    'png-fast': ('.png', {'compress_level': 1}),
+    'tiff': ('.tiff', {'compression': 'raw'}),
+    'tiff-deflate': ('.tiff', {'compression': 'tiff_adobe_deflate'}),
+}
+
+ARCHIVAL_FORMAT = 'png'
+
+
+def needs_recompression(intermediate: str, archival: str = ARCHIVAL_FORMAT) -> bool:
+    """
+    Check whether frames saved in an intermediate format differ from the archival format.
+
+    Args:
+    intermediate (str): Name of the intermediate format in INTERMEDIATE_FORMATS.
+    archival (str): Name of the archival format in INTERMEDIATE_FORMATS.
+
+    Returns:
+    bool: True if the frames have to be recompressed.
+    """
+    return INTERMEDIATE_FORMATS[intermediate] != INTERMEDIATE_FORMATS[archival]
+
+
+def recompress_image(path: str, archival: str = ARCHIVAL_FORMAT) -> Optional[str]:
+    """
+    Re-encode a single frame in the archival format, replacing the intermediate file.
+
+    The modification time of the original file is kept, since PDF pages are ordered by it.
+
+    Args:
+    path (str): Path of the intermediate frame.
+    archival (str): Name of the archival format in INTERMEDIATE_FORMATS.
+
+    Returns:
+    Optional[str]: Path of the recompressed frame, or None if recompression failed.
+    """
+    ext, params = INTERMEDIATE_FORMATS[archival]
+    target = os.path.splitext(path)[0] + ext
+    temp_path = target + '.tmp'
+    try:
+        stat = os.stat(path)
+        with Image.open(path) as img:
+            img.save(temp_path, Image.registered_extensions()[ext], **params)
+        os.replace(temp_path, target)
+        if target != path:
+            os.remove(path)
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        return target
+    except Exception as e:
+        print(f"Error recompressing {path}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+
+
+def recompress_images(paths: List[str], archival: str = ARCHIVAL_FORMAT, processes: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Recompress frames in parallel after a capture session.
+
+    Args:
+    paths (List[str]): Paths of the intermediate frames.
+    archival (str): Name of the archival format in INTERMEDIATE_FORMATS.
+    processes (Optional[int]): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+    List[Optional[str]]: Paths of the recompressed frames, in the order of paths.
+    """
+    if not paths:
+        return []
+    with multiprocessing.Pool(processes=processes) as pool:
+        return pool.starmap(recompress_image, [(path, archival) for path in paths])
+
+
+class BackgroundRecompressor:
+    """
+    Recompress frames on a background thread while the capture loop keeps running.
+
+    Pillow releases the GIL while encoding, so a single worker thread keeps the
+    recompression off the capture loop without competing for the interpreter.
+    """
+
+    def __init__(self, archival: str = ARCHIVAL_FORMAT):
+        self.archival = archival
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures = []
+
+    def submit(self, path: str):
+        self.futures.append(self.executor.submit(recompress_image, path, self.archival))
+
+    def close(self) -> List[Optional[str]]:
+        """
+        Wait for all queued frames to be recompressed.
+
+        Returns:
+        List[Optional[str]]: Paths of the recompressed frames, in submission order.
+        """
+        self.executor.shutdown(wait=True)
+        return [future.result() for future in self.futures]
@@ -1,10 +1,20 @@
-import pyautogui # type: ignore
+import hashlib
 import os
+import shutil
 import tkinter as tk
 from PIL import Image
 from datetime import datetime
 from PIL import ImageGrab
 from typing import Tuple, Optional
+from service.frame_store import frame_key
+
+try:
+    import pyautogui # type: ignore
+except ImportError:
+    raise
+except Exception:
+    # pyautogui connects to DISPLAY on import; modes that need no screen run without it
+    pyautogui = None
 
 
 def take_screenshot() -> Image.Image:
@@ -15,6 +25,8 @@ def take_screenshot() -> Image.Image:
     Image.Image: The captured screenshot as a PIL Image object.
     """
     try:
+        if pyautogui is None:
+            raise RuntimeError("pyautogui could not connect to an X display; check DISPLAY")
         # Take a full screen screenshot
         screenshot = pyautogui.screenshot()
         return screenshot
@@ -63,7 +75,7 @@ def generate_default_screenshot_path() -> str:
     return os.path.join(os.getcwd(), default_name)
 
 
-def save_screenshot(screenshot: Image.Image, save_path: str = None) -> str:
+def save_screenshot(screenshot: Image.Image, save_path: str = None, store=None, save_params: dict = None) -> str:
     """
     Save the given screenshot to the specified path or generate a default path.
 
@@ -71,6 +83,9 @@ def save_screenshot(screenshot: Image.Image, save_path: str = None) -> str:
     screenshot (Image.Image): The screenshot to save.
     save_path (str, optional): The file path where the screenshot should be saved.
                                If not provided, a default path will be generated.
+    store (FrameStore, optional): Frame store to reuse previously encoded identical
+                                  frames from instead of encoding them again.
+    save_params (dict, optional): Extra Pillow save parameters, e.g. from INTERMEDIATE_FORMATS.
 
     Returns:
     str: The path where the screenshot was saved, or None if saving failed.
@@ -93,9 +108,23 @@ def save_screenshot(screenshot: Image.Image, save_path: str = None) -> str:
                 if not os.path.exists(directory):
                     os.makedirs(directory)
         
-        # Save the screenshot
-        screenshot.save(save_path)
-        
+        save_params = save_params or {}
+        if store is None:
+            # Save the screenshot
+            screenshot.save(save_path, **save_params)
+            return save_path
+
+        key = frame_key(screenshot)
+        if save_params:
+            # Encodings that share an extension, like png and png-fast, must not share entries
+            key += '-' + hashlib.blake2b(repr(sorted(save_params.items())).encode(), digest_size=4).hexdigest()
+        cached = store.get_frame(key, os.path.splitext(save_path)[1])
+        if cached:
+            shutil.copyfile(cached, save_path)
+        else:
+            screenshot.save(save_path, **save_params)
+            store.put_frame(key, save_path)
+
         return save_path
     except Exception as e:
         print(f"Error saving screenshot: {str(e)}")
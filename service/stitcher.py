@@ -0,0 +1,123 @@
+from typing import List, Optional
+from PIL import Image
+
+
+def row_hashes(img: Image.Image) -> List[int]:
+    """
+    Hash every pixel row of an image.
+
+    Args:
+    img (Image.Image): The image.
+
+    Returns:
+    List[int]: One hash per row, top to bottom.
+    """
+    data = img.tobytes()
+    stride = len(data) // img.height if img.height else 0
+    return [hash(data[offset:offset + stride]) for offset in range(0, len(data), stride or 1)]
+
+
+def find_overlap(previous: List[int], current: List[int], min_overlap: int = 1) -> int:
+    """
+    Find how many rows at the top of the current frame repeat the bottom of the previous one.
+
+    Candidate offsets are the rows of the previous frame whose hash equals the first row
+    of the current frame; each is confirmed by comparing the whole overlapping run of
+    hashes at once. The largest confirmed overlap, i.e. the smallest scroll, wins.
+
+    Args:
+    previous (List[int]): Row hashes of the previous frame.
+    current (List[int]): Row hashes of the current frame.
+    min_overlap (int): Overlaps shorter than this are treated as no overlap.
+
+    Returns:
+    int: The number of overlapping rows, or 0 if the frames do not overlap.
+    """
+    if not previous or not current:
+        return 0
+
+    first = current[0]
+    for start in range(max(0, len(previous) - len(current)), len(previous)):
+        overlap = len(previous) - start
+        if overlap < min_overlap:
+            break
+        if previous[start] == first and previous[start:] == current[:overlap]:
+            return overlap
+    return 0
+
+
+class ScrollStitcher:
+    """
+    Stitch the frames of a continuously scrolling document into fixed-height pages.
+
+    Only the rows a frame adds below the previous frame are kept, so the stored pixels
+    grow with the unique content rather than with the number of frames.
+    """
+
+    def __init__(self, page_height: int, min_overlap: int = 8):
+        if page_height <= 0:
+            raise ValueError("page_height must be positive")
+        self.page_height = page_height
+        self.min_overlap = min_overlap
+        self.previous: Optional[List[int]] = None
+        self.strips: List[Image.Image] = []
+        self.pending_height = 0
+        self.width = None
+        self.mode = None
+
+    def add_frame(self, frame: Image.Image) -> List[Image.Image]:
+        """
+        Append the new rows of a frame to the canvas.
+
+        Args:
+        frame (Image.Image): The next captured frame, scrolled down from the previous one.
+
+        Returns:
+        List[Image.Image]: Pages completed by this frame, possibly none.
+
+        Raises:
+        ValueError: If the frame width or mode differs from the first frame.
+        """
+        if self.width is None:
+            self.width, self.mode = frame.width, frame.mode
+        elif (frame.width, frame.mode) != (self.width, self.mode):
+            raise ValueError("All frames of a stitched capture must have the same width and mode")
+
+        hashes = row_hashes(frame)
+        overlap = find_overlap(self.previous, hashes, self.min_overlap) if self.previous else 0
+        self.previous = hashes
+
+        if overlap < frame.height:
+            self.strips.append(frame.crop((0, overlap, frame.width, frame.height)))
+            self.pending_height += frame.height - overlap
+
+        pages = []
+        while self.pending_height >= self.page_height:
+            pages.append(self._cut(self.page_height))
+        return pages
+
+    def finish(self) -> List[Image.Image]:
+        """
+        Flush the remaining rows as a final, shorter page.
+
+        Returns:
+        List[Image.Image]: The last page, or an empty list if no rows are pending.
+        """
+        if not self.pending_height:
+            return []
+        return [self._cut(self.pending_height)]
+
+    def _cut(self, height: int) -> Image.Image:
+        page = Image.new(self.mode, (self.width, height))
+        y = 0
+        while y < height:
+            strip = self.strips[0]
+            take = min(strip.height, height - y)
+            page.paste(strip.crop((0, 0, self.width, take)), (0, y))
+            if take == strip.height:
+                self.strips.pop(0)
+            else:
+                self.strips[0] = strip.crop((0, take, self.width, strip.height))
+            y += take
+        self.pending_height -= height
+        return page
@@ -0,0 +1,214 @@
+import hashlib
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from PIL import Image
+
+
+DEFAULT_BUFFER_BYTES = 256 * 1024 ** 2
+DEFAULT_CONSUMERS = 2
+
+
+class FrameRing:
+    """
+    Fixed set of preallocated raw frame buffers between the capture thread and the encoders.
+
+    The capture thread copies each frame into a free slot and never waits for the
+    consumers: when every slot still holds a frame that has not been encoded, the new
+    frame is dropped and counted instead. Consumers take frames in capture order.
+    """
+
+    def __init__(self, size: Tuple[int, int], mode: str, max_bytes: int = DEFAULT_BUFFER_BYTES):
+        self.size = size
+        self.mode = mode
+        self.frame_bytes = len(Image.new(mode, (size[0], 1)).tobytes()) * size[1]
+        count = max_bytes // self.frame_bytes if self.frame_bytes else 0
+        if count < 2:
+            raise ValueError(f"A buffer of {max_bytes} bytes cannot hold two {size[0]}x{size[1]} frames")
+        self.slots = [bytearray(self.frame_bytes) for _ in range(count)]
+        self.free = deque(range(count))
+        self.filled = deque()
+        self.sequence = 0
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, frame: Image.Image, timestamp: int) -> bool:
+        """
+        Copy a frame into a free slot.
+
+        Args:
+        frame (Image.Image): The captured frame.
+        timestamp (int): Wall-clock capture time in nanoseconds.
+
+        Returns:
+        bool: True if the frame was buffered, False if it was dropped because the buffer is full.
+
+        Raises:
+        ValueError: If the frame size or mode differs from the buffer's.
+        """
+        if frame.size != self.size or frame.mode != self.mode:
+            raise ValueError(f"Expected a {self.mode} frame of {self.size}, got {frame.mode} {frame.size}")
+        with self.condition:
+            if not self.free:
+                self.dropped += 1
+                return False
+            index = self.free.popleft()
+        self.slots[index][:] = frame.tobytes()
+        with self.condition:
+            self.filled.append((self.sequence, index, timestamp))
+            self.sequence += 1
+            self.condition.notify()
+        return True
+
+    def take(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Wait for the oldest buffered frame.
+
+        Returns:
+        Optional[Tuple[int, int, int]]: The frame's (sequence, slot, timestamp), or None once
+                                        the ring is closed and drained.
+        """
+        with self.condition:
+            while not self.filled and not self.closed:
+                self.condition.wait()
+            return self.filled.popleft() if self.filled else None
+
+    def release(self, index: int):
+        with self.condition:
+            self.free.append(index)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class TimedCapture:
+    """
+    Capture frames at a fixed rate, independently of how fast they can be encoded.
+
+    The calling thread only grabs frames on schedule and copies them into a FrameRing.
+    Consumer threads drop frames identical to the one captured just before, then hand
+    the rest to save_frame; Pillow releases the GIL while encoding, so encoding overlaps
+    with capture. Ticks that come around while the previous grab is still running are
+    skipped and counted as missed.
+    """
+
+    def __init__(
+            self,
+            grab: Callable[[], Optional[Image.Image]],
+            save_frame: Callable[[Image.Image, int, int], Optional[str]],
+            fps: float,
+            max_buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+            consumers: int = DEFAULT_CONSUMERS,
+            clock: Optional[Callable[[], float]] = None,
+            sleep: Optional[Callable[[float], None]] = None
+        ):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.grab = grab
+        self.save_frame = save_frame
+        self.fps = fps
+        self.max_buffer_bytes = max_buffer_bytes
+        self.consumers = max(1, consumers)
+        self.clock = clock or time.perf_counter
+        self.sleep = sleep or time.sleep
+        self.order = threading.Condition()
+        self.compared = 0
+        self.last_digest = None
+        self.duplicates = 0
+        self.saved: List[Tuple[int, str]] = []
+
+    def run(self, frames: int) -> Tuple[List[str], Dict[str, float]]:
+        """
+        Capture for the given number of ticks and wait for every buffered frame to be saved.
+
+        Args:
+        frames (int): Number of ticks, i.e. the capture lasts frames / fps seconds.
+
+        Returns:
+        Tuple[List[str], Dict[str, float]]: The saved paths in capture order, and statistics
+            with the 'target_fps' and achieved 'fps', the 'jitter_ms' (standard deviation of
+            the capture intervals), and the counts of 'captured', 'dropped' (buffer full),
+            'missed' (late ticks), 'failed', 'duplicates' and 'saved' frames.
+        """
+        interval = 1 / self.fps
+        first = self.grab() if frames > 0 else None
+        start = self.clock()
+        stats = {'target_fps': self.fps, 'fps': 0.0, 'jitter_ms': 0.0, 'captured': 0, 'dropped': 0,
+                 'missed': 0, 'failed': 0, 'duplicates': 0, 'saved': 0}
+        if first is None:
+            stats['failed'] = frames
+            return [], stats
+
+        ring = FrameRing(first.size, first.mode, self.max_buffer_bytes)
+        threads = [threading.Thread(target=self._consume, args=(ring,), daemon=True) for _ in range(self.consumers)]
+        for thread in threads:
+            thread.start()
+
+        capture_times = []
+        frame = first
+        try:
+            for tick in range(frames):
+                if tick:
+                    wait = start + tick * interval - self.clock()
+                    if wait > 0:
+                        self.sleep(wait)
+                    elif wait <= -interval:
+                        stats['missed'] += 1
+                        continue
+                    frame = self.grab()
+                captured_at = self.clock()
+                if frame is None or frame.size != ring.size or frame.mode != ring.mode:
+                    stats['failed'] += 1
+                    continue
+                capture_times.append(captured_at)
+                ring.put(frame, time.time_ns())
+        finally:
+            ring.close()
+            for thread in threads:
+                thread.join()
+
+        intervals = [later - earlier for earlier, later in zip(capture_times, capture_times[1:])]
+        elapsed = sum(intervals)
+        if elapsed:
+            stats['fps'] = len(intervals) / elapsed
+            stats['jitter_ms'] = statistics.pstdev(intervals) * 1000
+        stats['captured'] = len(capture_times)
+        stats['dropped'] = ring.dropped
+        stats['duplicates'] = self.duplicates
+        stats['saved'] = len(self.saved)
+        return [path for _, path in sorted(self.saved)], stats
+
+    def _consume(self, ring: FrameRing):
+        while True:
+            item = ring.take()
+            if item is None:
+                return
+            sequence, index, timestamp = item
+            data = ring.slots[index]
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+
+            # Frames are compared in capture order, whichever consumer took them
+            with self.order:
+                while self.compared != sequence:
+                    self.order.wait()
+                duplicate = digest == self.last_digest
+                self.last_digest = digest
+                self.compared += 1
+                if duplicate:
+                    self.duplicates += 1
+                self.order.notify_all()
+
+            if duplicate:
+                ring.release(index)
+                continue
+            frame = Image.frombytes(ring.mode, ring.size, data)
+            ring.release(index)
+            path = self.save_frame(frame, sequence, timestamp)
+            if path:
+                with self.order:
+                    self.saved.append((sequence, path))
@@ -0,0 +1,180 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Optional, Set, Tuple
+from PIL import Image
+
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def is_image_complete(path: str) -> bool:
+    """
+    Check whether an image file has been written completely.
+
+    PNG files must end with an IEND chunk and JPEG files with an EOI marker; files in
+    other formats must decode without being truncated.
+
+    Args:
+    path (str): Path to the image file.
+
+    Returns:
+    bool: True if the file holds a complete image.
+    """
+    try:
+        with open(path, 'rb') as file:
+            head = file.read(8)
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(max(0, size - 12))
+            tail = file.read()
+        if head.startswith(b'\x89PNG'):
+            return tail[4:8] == b'IEND'
+        if head.startswith(b'\xff\xd8'):
+            return tail.endswith(b'\xff\xd9')
+        with Image.open(path) as img:
+            img.load()
+        return True
+    except Exception:
+        return False
+
+
+class InotifyWatcher:
+    """
+    Report files written or moved into a directory, using Linux inotify through ctypes.
+    """
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def changes(self, timeout: float) -> Set[str]:
+        """
+        Wait up to timeout seconds for changes.
+
+        Returns:
+        Set[str]: Names of the files that changed.
+        """
+        names = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        while readable:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Report changed files in a directory by comparing sizes and modification times.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.seen = self.scan()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        with os.scandir(self.directory) as entries:
+            return {
+                entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns)
+                for entry in entries if entry.is_file()
+            }
+
+    def changes(self, timeout: float) -> Set[str]:
+        """
+        Sleep for timeout seconds, then rescan the directory.
+
+        Returns:
+        Set[str]: Names of the files that are new or changed since the last scan.
+        """
+        time.sleep(timeout)
+        current = self.scan()
+        names = {name for name, state in current.items() if self.seen.get(name) != state}
+        self.seen = current
+        return names
+
+    def close(self):
+        pass
+
+
+def create_watcher(directory: str, polling: bool = False):
+    """
+    Create an inotify watcher, falling back to polling where inotify is unavailable.
+
+    Args:
+    directory (str): The directory to watch.
+    polling (bool): Force the polling watcher.
+
+    Returns:
+    InotifyWatcher or PollingWatcher: The watcher.
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable, polling instead: {e}")
+    return PollingWatcher(directory)
+
+
+class Debouncer:
+    """
+    Hold back changed files until they have been quiet for 'settle' seconds.
+    """
+
+    def __init__(self, settle: float, clock=time.monotonic):
+        self.settle = settle
+        self.clock = clock
+        self.pending: Dict[str, float] = {}
+
+    def touch(self, names: Set[str]):
+        now = self.clock()
+        for name in names:
+            self.pending[name] = now
+
+    def settled(self) -> Set[str]:
+        """
+        Take the files that have not changed for at least 'settle' seconds.
+
+        Returns:
+        Set[str]: Names of the settled files, removed from the pending set.
+        """
+        now = self.clock()
+        names = {name for name, changed in self.pending.items() if now - changed >= self.settle}
+        for name in names:
+            del self.pending[name]
+        return names
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        Seconds until the next pending file settles, or None if nothing is pending.
+        """
+        if not self.pending:
+            return None
+        return max(0.0, min(self.pending.values()) + self.settle - self.clock())
@@ -0,0 +1,305 @@
+import json
+import multiprocessing
+import os
+import queue
+import shlex
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+
+DEFAULT_SCREEN = '1920x1080x24'
+FIRST_DISPLAY_NUMBER = 100
+
+
+def load_jobs(path: str) -> List[dict]:
+    """
+    Load capture jobs from a JSON file.
+
+    The file holds a list of jobs. Each job needs a viewer 'command' (string or argument
+    list) and an 'output' directory, and may set 'repeat', 'roi' ([left, top, right, bottom]),
+    'skey', 'input_backend', 'delay' (seconds after each key press) and 'startup_delay'
+    (seconds to wait for the viewer before the first screenshot).
+
+    Args:
+    path (str): Path of the jobs file.
+
+    Returns:
+    List[dict]: The jobs with defaults filled in, or an empty list if the file is invalid.
+    """
+    from service.input_simulator import parse_json_file
+
+    try:
+        with open(path, 'r') as file:
+            data = json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error reading jobs file {path}: {e}")
+        return []
+
+    if not isinstance(data, list):
+        print(f"Jobs file {path} must contain a list of jobs")
+        return []
+
+    defaults = parse_json_file('resources/single_key.json')
+    jobs = []
+    for index, job in enumerate(data):
+        if not isinstance(job, dict) or not job.get('command') or not job.get('output'):
+            print(f"Skipping job {index + 1}: 'command' and 'output' are required")
+            continue
+        command = job['command']
+        jobs.append({
+            'id': index,
+            'command': shlex.split(command) if isinstance(command, str) else list(command),
+            'output': job['output'],
+            'repeat': int(job.get('repeat', defaults.get('repeat', 1))),
+            'roi': tuple(job['roi']) if job.get('roi') else None,
+            'skey': job.get('skey', defaults.get('skey', 'pagedown')),
+            'input_backend': job.get('input_backend', defaults.get('input_backend', 'pyautogui')),
+            'delay': job.get('delay', 1),
+            'startup_delay': job.get('startup_delay', 5),
+        })
+    return jobs
+
+
+def schedule_jobs(jobs: List[dict]) -> List[dict]:
+    """
+    Order jobs longest first so the displays pulling from the shared queue finish together.
+
+    Args:
+    jobs (List[dict]): The jobs from load_jobs.
+
+    Returns:
+    List[dict]: The jobs in dispatch order.
+    """
+    return sorted(jobs, key=lambda job: job['repeat'], reverse=True)
+
+
+def start_virtual_display(number: int, screen: str = DEFAULT_SCREEN, timeout: float = 10) -> subprocess.Popen:
+    """
+    Start an Xvfb server and wait until it accepts connections.
+
+    Args:
+    number (int): The X display number.
+    screen (str): Screen geometry and depth. Defaults to DEFAULT_SCREEN.
+    timeout (float): Seconds to wait for the server socket.
+
+    Returns:
+    subprocess.Popen: The Xvfb process.
+
+    Raises:
+    RuntimeError: If the server does not come up in time.
+    """
+    process = subprocess.Popen(
+        ['Xvfb', f':{number}', '-screen', '0', screen, '-nolisten', 'tcp'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    socket_path = f"/tmp/.X11-unix/X{number}"
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"Xvfb failed to start on display :{number}")
+        time.sleep(0.05)
+    return process
+
+
+def free_display_numbers(count: int, start: int = FIRST_DISPLAY_NUMBER) -> List[int]:
+    """
+    Find X display numbers that are not in use.
+
+    Args:
+    count (int): How many display numbers are needed.
+    start (int): The first display number to consider.
+
+    Returns:
+    List[int]: The free display numbers.
+    """
+    numbers = []
+    number = start
+    while len(numbers) < count:
+        if not os.path.exists(f"/tmp/.X{number}-lock") and not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            numbers.append(number)
+        number += 1
+    return numbers
+
+
+def run_job(job: dict, display: str, events) -> str:
+    """
+    Launch the job's viewer on the display, capture its pages and build the PDF.
+
+    Args:
+    job (dict): The job from load_jobs.
+    display (str): The X display the viewer and screenshots are bound to.
+    events: Queue receiving ('progress', job_id, done, total) tuples.
+
+    Returns:
+    str: Path of the created PDF file.
+    """
+    from service.input_simulator import set_input_backend, simulate_key
+    from service.pdf_handler import save_images_to_pdf
+    from service.screenshooter import save_screenshot, take_screenshot, take_screenshot_roi
+
+    os.makedirs(job['output'], exist_ok=True)
+    set_input_backend(job.get('input_backend', 'pyautogui'))
+    viewer = subprocess.Popen(job['command'], env=dict(os.environ, DISPLAY=display))
+    try:
+        time.sleep(job['startup_delay'])
+        for i in range(job['repeat']):
+            screenshot = take_screenshot() if job['roi'] is None else take_screenshot_roi(job['roi'])
+            if screenshot:
+                save_screenshot(screenshot, os.path.join(job['output'], f"screenshot_{i+1}.png"))
+            simulate_key(job['skey'])
+            time.sleep(job['delay'])
+            events.put(('progress', job['id'], i + 1, job['repeat']))
+    finally:
+        viewer.terminate()
+        try:
+            viewer.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            viewer.kill()
+
+    return save_images_to_pdf(job['output'], os.path.join(job['output'], "output.pdf"))
+
+
+def display_worker(display: str, job_queue, events):
+    """
+    Run jobs from the shared queue on one display until the queue is drained.
+
+    This runs in its own spawned process, started by start_display_workers with DISPLAY
+    already set to the worker's display.
+    """
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        events.put(('started', job['id'], display))
+        try:
+            events.put(('done', job['id'], run_job(job, display, events)))
+        except Exception as e:
+            events.put(('failed', job['id'], str(e)))
+
+
+def start_display_workers(ctx, displays: List[str], target, args: tuple) -> list:
+    """
+    Start one spawned worker process per display.
+
+    A spawned child re-imports the parent's main module, and with it pyautogui, which
+    connects to the X display named by DISPLAY as soon as it is imported. DISPLAY is
+    therefore set in the parent while each child starts, since the child copies the
+    environment at that point.
+
+    Args:
+    ctx: The 'spawn' multiprocessing context.
+    displays (List[str]): The X displays, one worker each.
+    target: The worker function, called as target(display, *args).
+    args (tuple): The remaining arguments of the worker function.
+
+    Returns:
+    list: The started processes.
+    """
+    processes = []
+    previous = os.environ.get('DISPLAY')
+    try:
+        for display in displays:
+            os.environ['DISPLAY'] = display
+            process = ctx.Process(target=target, args=(display,) + args)
+            process.start()
+            processes.append(process)
+    finally:
+        if previous is None:
+            os.environ.pop('DISPLAY', None)
+        else:
+            os.environ['DISPLAY'] = previous
+    return processes
+
+
+def format_progress(jobs: List[dict], done_frames: Dict[int, int], finished: int) -> str:
+    """
+    Summarise the progress of all jobs on one line.
+
+    Args:
+    jobs (List[dict]): All scheduled jobs.
+    done_frames (Dict[int, int]): Frames captured so far per job id.
+    finished (int): Number of jobs that completed or failed.
+
+    Returns:
+    str: The progress line.
+    """
+    total = sum(job['repeat'] for job in jobs)
+    done = sum(done_frames.values())
+    percent = 100 * done / total if total else 100
+    return f"Jobs {finished}/{len(jobs)}, frames {done}/{total} ({percent:.0f}%)"
+
+
+def run_worker_pool(
+        jobs: List[dict],
+        workers: Optional[int] = None,
+        displays: Optional[List[str]] = None,
+        screen: str = DEFAULT_SCREEN
+    ) -> Dict[int, Optional[str]]:
+    """
+    Capture many documents in parallel, one session per X display.
+
+    Each display gets a worker process that pulls jobs from a shared queue, so faster
+    displays take on more jobs. Xvfb servers are started for the workers unless existing
+    displays are given.
+
+    Args:
+    jobs (List[dict]): The jobs from load_jobs.
+    workers (Optional[int]): Number of Xvfb displays to start. Defaults to the CPU count.
+    displays (Optional[List[str]]): Existing displays to use instead of starting Xvfb.
+    screen (str): Xvfb screen geometry and depth.
+
+    Returns:
+    Dict[int, Optional[str]]: The PDF path of each job id, or None if the job failed.
+    """
+    servers = []
+    processes = []
+    results = {}
+    done_frames = {}
+    try:
+        if not displays:
+            count = min(workers or os.cpu_count() or 1, len(jobs))
+            numbers = free_display_numbers(count)
+            for number in numbers:
+                servers.append(start_virtual_display(number, screen))
+            displays = [f":{number}" for number in numbers]
+
+        ctx = multiprocessing.get_context('spawn')
+        job_queue = ctx.Queue()
+        events = ctx.Queue()
+        for job in schedule_jobs(jobs):
+            job_queue.put(job)
+        for _ in displays:
+            job_queue.put(None)
+
+        processes = start_display_workers(ctx, displays, display_worker, (job_queue, events))
+
+        while len(results) < len(jobs):
+            try:
+                event = events.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    print("All workers exited before finishing their jobs")
+                    break
+                continue
+            if event[0] == 'started':
+                print(f"Job {event[1] + 1} started on display {event[2]}")
+                continue
+            if event[0] == 'progress':
+                done_frames[event[1]] = event[2]
+            elif event[0] == 'done':
+                results[event[1]] = event[2]
+                print(f"Job {event[1] + 1} saved to {event[2]}")
+            elif event[0] == 'failed':
+                results[event[1]] = None
+                print(f"Job {event[1] + 1} failed: {event[2]}")
+            print(format_progress(jobs, done_frames, len(results)))
+    finally:
+        for process in processes:
+            process.join()
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+    return results
@@ -0,0 +1,130 @@
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from typing import List, Tuple
+from unittest.mock import patch
+from PIL import Image
+
+
+NEXT_PAGE_KEYS = {'pagedown', 'pgdn', 'right', 'down', 'space', ' ', 'enter'}
+PREVIOUS_PAGE_KEYS = {'pageup', 'pgup', 'left', 'up', 'backspace'}
+
+
+class VirtualClock:
+    """
+    Clock that only moves when slept on, so timed sessions run instantly and deterministically.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.sleeps: List[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += max(seconds, 0)
+
+
+class SimulatedViewer:
+    """
+    Fake document viewer showing one page at a time on a simulated screen.
+
+    Each page is a solid frame whose first two channels encode the page index, so a
+    captured frame can be traced back to the page it shows with page_of. A key press
+    takes render_latency seconds of virtual time to show the new page.
+    """
+
+    def __init__(self, pages: int, clock: VirtualClock, size: Tuple[int, int] = (64, 48), render_latency: float = 0.0):
+        self.pages = pages
+        self.clock = clock
+        self.size = size
+        self.render_latency = render_latency
+        self.page = 0
+        self.pending: List[Tuple[float, int]] = []
+        self.presses: List[str] = []
+
+    def render(self, page: int) -> Image.Image:
+        return Image.new('RGB', self.size, color=(page & 0xFF, (page >> 8) & 0xFF, 128))
+
+    @staticmethod
+    def page_of(frame: Image.Image) -> int:
+        red, green, _ = frame.convert('RGB').getpixel((0, 0))
+        return red | (green << 8)
+
+    def visible_page(self) -> int:
+        while self.pending and self.clock.time() >= self.pending[0][0]:
+            self.page = self.pending.pop(0)[1]
+        return self.page
+
+    def press(self, key: str):
+        self.presses.append(key)
+        page = self.pending[-1][1] if self.pending else self.visible_page()
+        key = key.lower()
+        if key in NEXT_PAGE_KEYS:
+            page = min(page + 1, self.pages - 1)
+        elif key in PREVIOUS_PAGE_KEYS:
+            page = max(page - 1, 0)
+        elif key == 'home':
+            page = 0
+        elif key == 'end':
+            page = self.pages - 1
+        self.pending.append((self.clock.time() + self.render_latency, page))
+
+    def screenshot(self, *args, **kwargs) -> Image.Image:
+        return self.render(self.visible_page())
+
+    def grab(self, bbox=None, *args, **kwargs) -> Image.Image:
+        frame = self.screenshot()
+        return frame.crop(bbox) if bbox else frame
+
+
+@contextmanager
+def simulated_session(viewer: SimulatedViewer):
+    """
+    Route screenshots, key presses and sleeps of a capture session to a simulated viewer.
+
+    pyautogui and Pillow's grabber read frames from the viewer, pyautogui key presses
+    drive it, time.sleep advances the viewer's virtual clock instead of blocking, and
+    time.perf_counter reads it. pyautogui is replaced as a whole, so sessions also run
+    where it could not be imported for lack of a display.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(patch('time.sleep', viewer.clock.sleep))
+        stack.enter_context(patch('time.perf_counter', viewer.clock.time))
+        stack.enter_context(patch('service.screenshooter.pyautogui', SimpleNamespace(screenshot=viewer.screenshot)))
+        stack.enter_context(patch('service.screenshooter.ImageGrab.grab', viewer.grab))
+        stack.enter_context(patch('service.input_simulator.pg', SimpleNamespace(press=viewer.press)))
+        yield viewer
+
+
+class SimulatedScrollingViewer(SimulatedViewer):
+    """
+    Fake continuous-scroll viewer: a viewport over one tall document that moves down by
+    'scroll' rows per next-page key press and stops at the end of the document.
+    """
+
+    def __init__(self, document: Image.Image, clock: VirtualClock, viewport_height: int, scroll: int):
+        max_offset = document.height - viewport_height
+        super().__init__(max_offset // scroll + 1 + (max_offset % scroll > 0), clock,
+                         size=(document.width, viewport_height))
+        self.document = document
+        self.scroll = scroll
+
+    def render(self, page: int) -> Image.Image:
+        top = min(page * self.scroll, self.document.height - self.size[1])
+        return self.document.crop((0, top, self.document.width, top + self.size[1]))
+
+
+class SimulatedSlideshow(SimulatedViewer):
+    """
+    Fake auto-advancing presentation that shows the next page every slide_seconds of
+    virtual time, without any key presses, and stays on the last page.
+    """
+
+    def __init__(self, pages: int, clock: VirtualClock, slide_seconds: float, size: Tuple[int, int] = (64, 48)):
+        super().__init__(pages, clock, size=size)
+        self.slide_seconds = slide_seconds
+
+    def visible_page(self) -> int:
+        return min(int(self.clock.time() / self.slide_seconds + 1e-9), self.pages - 1)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from PIL import Image
+from service.frame_store import FrameStore, file_key, frame_key
+from service.pdf_writer import ImageStream
+
+
+class TestFrameStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store_dir = os.path.join(self.temp_dir.name, 'store')
+
+    def make_frame_file(self, name, color):
+        path = os.path.join(self.temp_dir.name, name)
+        Image.new('RGB', (16, 16), color=color).save(path)
+        return path
+
+    def test_frame_key_depends_on_pixels_and_size(self):
+        red = Image.new('RGB', (8, 8), color='red')
+
+        self.assertEqual(frame_key(red), frame_key(Image.new('RGB', (8, 8), color='red')))
+        self.assertNotEqual(frame_key(red), frame_key(Image.new('RGB', (8, 8), color='blue')))
+        self.assertNotEqual(frame_key(red), frame_key(Image.new('RGB', (4, 16), color='red')))
+
+    def test_frame_key_depends_on_palette(self):
+        first = Image.new('P', (8, 8))
+        first.putpalette([255, 0, 0] * 256)
+        second = Image.new('P', (8, 8))
+        second.putpalette([0, 0, 255] * 256)
+
+        self.assertNotEqual(frame_key(first), frame_key(second))
+
+    def test_put_and_get_frame(self):
+        store = FrameStore(self.store_dir)
+        path = self.make_frame_file('frame.png', 'red')
+
+        self.assertIsNone(store.get_frame('abc'))
+        stored = store.put_frame('abc', path)
+
+        self.assertEqual(store.get_frame('abc'), stored)
+        self.assertIsNone(store.get_frame('abc', '.jpg'))
+        with open(path, 'rb') as a, open(stored, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_image_stream_round_trip_persists(self):
+        stream = ImageStream(3, 2, '/DeviceRGB', 8, '/FlateDecode', None, b'\x00\x01\x02')
+        FrameStore(self.store_dir).put_image_stream('key', stream)
+
+        self.assertEqual(FrameStore(self.store_dir).get_image_stream('key'), stream)
+
+    def test_evicts_least_recently_used(self):
+        store = FrameStore(self.store_dir)
+        third_path = self.make_frame_file('c.png', 'blue')
+        first = store.put_frame('first', self.make_frame_file('a.png', 'red'))
+        second = store.put_frame('second', self.make_frame_file('b.png', 'green'))
+        # Room for all three entries but one byte
+        store.max_bytes = store.total_bytes + os.path.getsize(third_path) - 1
+
+        # Touch the older entry so the newer one becomes least recently used
+        store.get_frame('first')
+        store.put_frame('third', third_path)
+
+        self.assertIsNotNone(store.get_frame('first'))
+        self.assertIsNone(store.get_frame('second'))
+        self.assertFalse(os.path.exists(second))
+        self.assertLessEqual(store.total_bytes, store.max_bytes)
+
+    def test_file_key_matches_copies(self):
+        path = self.make_frame_file('frame.png', 'red')
+        stored = FrameStore(self.store_dir).put_frame('abc', path)
+
+        self.assertEqual(file_key(path), file_key(stored))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from tests.harness import (
+    SimulatedScrollingViewer, SimulatedSlideshow, SimulatedViewer, VirtualClock, simulated_session
+)
+from tests.test_stitcher import noise_document
+from service.stitcher import ScrollStitcher
+from service.pdf_handler import get_images_sorted_by_modification
+from main import capture_timed_screenshots, save_images_to_pdf_file, simulate_keys_and_take_screenshots
+
+
+class TestHarness(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch('builtins.print')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_viewer_pages_follow_key_presses(self):
+        clock = VirtualClock()
+        viewer = SimulatedViewer(3, clock, render_latency=0.5)
+
+        viewer.press('pagedown')
+        self.assertEqual(viewer.page_of(viewer.screenshot()), 0)
+        clock.sleep(0.5)
+        self.assertEqual(viewer.page_of(viewer.screenshot()), 1)
+
+        for key in ('pagedown', 'pagedown', 'pagedown'):
+            viewer.press(key)
+        clock.sleep(1)
+        self.assertEqual(viewer.page_of(viewer.grab((0, 0, 8, 8))), 2)
+        viewer.press('home')
+        clock.sleep(1)
+        self.assertEqual(viewer.visible_page(), 0)
+
+    def test_capture_session_end_to_end(self):
+        clock = VirtualClock()
+        viewer = SimulatedViewer(20, clock, render_latency=0.2)
+
+        with simulated_session(viewer):
+            saved_paths = simulate_keys_and_take_screenshots(20, self.temp_dir.name)
+            save_images_to_pdf_file(self.temp_dir.name)
+
+        self.assertEqual(len(saved_paths), 20)
+        self.assertEqual(get_images_sorted_by_modification(self.temp_dir.name), saved_paths)
+        for page, path in enumerate(saved_paths):
+            with Image.open(path) as frame:
+                self.assertEqual(viewer.page_of(frame), page)
+        # 5 s countdown, then 1 s before and after every screenshot
+        self.assertEqual(clock.time(), 5 + 2 * 20)
+        with open(os.path.join(self.temp_dir.name, 'output.pdf'), 'rb') as f:
+            self.assertIn(b'/Count 20', f.read())
+
+    def test_capture_session_roi_with_slow_viewer(self):
+        clock = VirtualClock()
+        # Pages take longer to render than the 2 s the loop waits, so frames lag one page behind
+        viewer = SimulatedViewer(5, clock, render_latency=2.5)
+
+        with simulated_session(viewer):
+            saved_paths = simulate_keys_and_take_screenshots(5, self.temp_dir.name, (0, 0, 32, 24))
+
+        pages = []
+        for path in saved_paths:
+            with Image.open(path) as frame:
+                self.assertEqual(frame.size, (32, 24))
+                pages.append(viewer.page_of(frame))
+        self.assertEqual(pages, [0, 0, 1, 2, 3])
+
+    def test_stitched_scroll_session(self):
+        clock = VirtualClock()
+        document = noise_document(32, 1000)
+        viewer = SimulatedScrollingViewer(document, clock, viewport_height=200, scroll=150)
+
+        with simulated_session(viewer):
+            # More frames than needed: the last ones repeat the bottom of the document
+            saved_paths = simulate_keys_and_take_screenshots(
+                viewer.pages + 2, self.temp_dir.name, stitcher=ScrollStitcher(page_height=300)
+            )
+
+        self.assertEqual([os.path.basename(path) for path in saved_paths],
+                         ['page_1.png', 'page_2.png', 'page_3.png', 'page_4.png'])
+        stitched = Image.new('RGB', (32, 1000))
+        for index, path in enumerate(saved_paths):
+            with Image.open(path) as page:
+                stitched.paste(page, (0, index * 300))
+        self.assertEqual(stitched.tobytes(), document.tobytes())
+
+    def test_timed_slideshow_session(self):
+        clock = VirtualClock()
+        slideshow = SimulatedSlideshow(6, clock, slide_seconds=0.5)
+
+        with simulated_session(slideshow):
+            saved_paths = capture_timed_screenshots(30, 10, self.temp_dir.name, (0, 0, 32, 24))
+            save_images_to_pdf_file(self.temp_dir.name)
+
+        # One frame per slide survives deduplication, in slide order on disk as well
+        self.assertEqual([os.path.basename(path) for path in saved_paths],
+                         ['frame_1.png', 'frame_6.png', 'frame_11.png', 'frame_16.png', 'frame_21.png', 'frame_26.png'])
+        self.assertEqual(get_images_sorted_by_modification(self.temp_dir.name), saved_paths)
+        for page, path in enumerate(saved_paths):
+            with Image.open(path) as frame:
+                self.assertEqual(frame.size, (32, 24))
+                self.assertEqual(slideshow.page_of(frame), page)
+        self.assertAlmostEqual(clock.time(), 2.9)
+        with open(os.path.join(self.temp_dir.name, 'output.pdf'), 'rb') as f:
+            self.assertIn(b'/Count 6', f.read())
+
+    def test_load_session(self):
+        pages = int(os.environ.get('SHOTPDF_LOAD_PAGES', 1000))
+        clock = VirtualClock()
+        viewer = SimulatedViewer(pages, clock, size=(16, 12))
+
+        with simulated_session(viewer):
+            saved_paths = simulate_keys_and_take_screenshots(pages, self.temp_dir.name)
+            save_images_to_pdf_file(self.temp_dir.name)
+
+        self.assertEqual(len(saved_paths), pages)
+        self.assertEqual(len(viewer.presses), pages)
+        with open(os.path.join(self.temp_dir.name, 'output.pdf'), 'rb') as f:
+            self.assertIn(b'/Count %d' % pages, f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,16 @@ class TestInputSimulator(unittest.TestCase):
         mock_press.assert_any_call('pagedown')
         mock_press.assert_any_call('pagedup')
 
+    @patch('time.sleep')
+    @patch('pyautogui.press')
+    def test_simulate_page_up_down_uses_input_backend(self, mock_press, mock_sleep):
+        import service.input_simulator as input_simulator
+        backend = input_simulator.PyAutoGUIBackend()
+        with patch.object(input_simulator, 'input_backend', backend):
+            simulate_page_up_down()
+
+        self.assertEqual(len(backend.latencies), 2)
+
     @patch('time.sleep')
     @patch('pyautogui.press')
     def test_simulate_valid_input(self, mock_press, mock_sleep):
@@ -87,6 +97,47 @@ class TestInputSimulator(unittest.TestCase):
         simulate_key('abc')
         mock_press.assert_called_once_with('abc')
 
+    def test_set_input_backend_unknown(self):
+        import service.input_simulator as input_simulator
+        with patch('logging.error') as mock_logging:
+            backend = input_simulator.set_input_backend('nope')
+        mock_logging.assert_called_once_with("Unknown input backend: nope")
+        self.assertIs(backend, input_simulator.input_backend)
+
+    def test_input_backend_is_abstract(self):
+        from service.input_simulator import InputBackend
+        with self.assertRaises(TypeError):
+            InputBackend()
+
+    @patch('Xlib.display.Display')
+    def test_xtest_backend_press(self, mock_display):
+        from Xlib import X
+        from service.input_simulator import XTestBackend
+        mock_display.return_value.keysym_to_keycode.return_value = 117
+
+        with patch('Xlib.ext.xtest.fake_input') as mock_fake_input:
+            backend = XTestBackend()
+            backend.press('pagedown')
+
+        mock_fake_input.assert_any_call(mock_display.return_value, X.KeyPress, 117)
+        mock_fake_input.assert_any_call(mock_display.return_value, X.KeyRelease, 117)
+        mock_display.return_value.sync.assert_called_once()
+        self.assertEqual(len(backend.latencies), 1)
+
+    @patch('pyautogui.press')
+    def test_input_latency_summary(self, mock_press):
+        import service.input_simulator as input_simulator
+        backend = input_simulator.PyAutoGUIBackend()
+        with patch.object(input_simulator, 'input_backend', backend):
+            self.assertEqual(input_simulator.input_latency_summary(), {})
+            for _ in range(3):
+                input_simulator.simulate_key('a')
+            summary = input_simulator.input_latency_summary()
+
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['measures'], 'call duration (including pyautogui.PAUSE)')
+        self.assertLessEqual(summary['p50'], summary['max'])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
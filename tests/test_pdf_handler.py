@@ -2,8 +2,14 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 import tempfile
+import threading
+import time
 from PIL import Image
-from service.pdf_handler import get_images_sorted_by_modification, save_images_to_pdf, append_images_to_pdf
+from service.pdf_handler import (
+    get_images_sorted_by_modification, save_images_to_pdf, append_images_to_pdf, watch_images_to_pdf, load_image_stream
+)
+from service.frame_store import FrameStore
+from tests.test_pdf_writer import page_widths
 
 class TestPDFHandler(unittest.TestCase):
 
@@ -53,13 +59,54 @@ class TestPDFHandler(unittest.TestCase):
         mock_canvas.return_value = mock_canvas_instance
 
         output_pdf = os.path.join(self.temp_dir, 'output.pdf')
-        result = save_images_to_pdf(self.temp_dir, output_pdf)
+        result = save_images_to_pdf(self.temp_dir, output_pdf, passthrough=False)
 
         self.assertEqual(result, output_pdf)
         mock_canvas.assert_called_once_with(output_pdf)
         self.assertEqual(mock_canvas_instance.drawImage.call_count, 3)
         mock_canvas_instance.save.assert_called_once()
 
+    @patch('service.pdf_handler.canvas.Canvas')
+    def test_save_images_to_pdf_passthrough(self, mock_canvas):
+        output_pdf = os.path.join(self.temp_dir, 'passthrough.pdf')
+        self.addCleanup(os.remove, output_pdf)
+
+        result = save_images_to_pdf(self.temp_dir, output_pdf)
+
+        self.assertEqual(result, output_pdf)
+        mock_canvas.assert_not_called()
+        with open(output_pdf, 'rb') as f:
+            data = f.read()
+        with open(os.path.join(self.temp_dir, 'image2.jpg'), 'rb') as f:
+            jpeg = f.read()
+        self.assertTrue(data.startswith(b'%PDF-'))
+        self.assertIn(b'/Count 3', data)
+        self.assertIn(jpeg, data)
+
+    def test_load_image_stream_stores_only_decoded_images(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FrameStore(store_dir)
+            for name in ('image1.png', 'image2.jpg'):
+                load_image_stream(os.path.join(self.temp_dir, name), store)
+            self.assertEqual(store.entries, {})
+
+            bmp_path = os.path.join(self.temp_dir, 'image3.bmp')
+            stream = load_image_stream(bmp_path, store)
+            self.assertEqual(len(store.entries), 1)
+            self.assertEqual(load_image_stream(bmp_path, FrameStore(store_dir)), stream)
+
+    def test_save_images_to_pdf_linearized(self):
+        output_pdf = os.path.join(self.temp_dir, 'linearized.pdf')
+        self.addCleanup(os.remove, output_pdf)
+
+        result = save_images_to_pdf(self.temp_dir, output_pdf, linearize=True)
+
+        self.assertEqual(result, output_pdf)
+        with open(output_pdf, 'rb') as f:
+            data = f.read()
+        self.assertIn(b'/Linearized 1', data[:1024])
+        self.assertIn(b'/N 3', data[:1024])
+
     def test_save_images_to_pdf_no_images(self):
         # Create a new empty directory for this test
         empty_dir = tempfile.mkdtemp()
@@ -85,6 +132,78 @@ class TestPDFHandler(unittest.TestCase):
         self.assertEqual(mock_canvas_instance.drawImage.call_count, 3)
         mock_canvas_instance.save.assert_called_once()
 
+    @patch('builtins.print')
+    def test_watch_images_to_pdf(self, mock_print):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        watch_dir = temp_dir.name
+        Image.new('RGB', (10, 10), color='red').save(os.path.join(watch_dir, 'first.png'))
+        output_pdf = os.path.join(watch_dir, 'output.pdf')
+
+        def deliver():
+            time.sleep(0.1)
+            with open(os.path.join(self.temp_dir, 'image1.png'), 'rb') as f:
+                data = f.read()
+            # Write the file in two parts, as a slow sync would
+            with open(os.path.join(watch_dir, 'second.png'), 'wb') as f:
+                f.write(data[:20])
+                f.flush()
+                time.sleep(0.2)
+                f.write(data[20:])
+            with open(os.path.join(watch_dir, 'notes.txt'), 'w') as f:
+                f.write('ignored')
+
+        thread = threading.Thread(target=deliver)
+        thread.start()
+        result = watch_images_to_pdf(watch_dir, output_pdf, settle=0.1, idle_timeout=0.5,
+                                     poll_interval=0.05, polling=True)
+        thread.join()
+
+        self.assertEqual(result, output_pdf)
+        with open(output_pdf, 'rb') as f:
+            data = f.read()
+        self.assertIn(b'/Count 2', data)
+        self.assertNotIn(b'/Count 3', data)
+        mock_print.assert_any_call(f"Added 1 images to {output_pdf} (2 pages)")
+
+    @patch('builtins.print')
+    def test_watch_images_to_pdf_inserts_late_older_image(self, mock_print):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        watch_dir = temp_dir.name
+        output_pdf = os.path.join(temp_dir.name, 'output.pdf')
+
+        def save_frame(index):
+            path = os.path.join(watch_dir, f's_{index}.png')
+            Image.new('L', (10 + index, 10)).save(path)
+            os.utime(path, (100 * (index + 1), 100 * (index + 1)))
+
+        for index in (1, 2, 3):
+            save_frame(index)
+
+        def page_count_reached():
+            if not os.path.exists(output_pdf):
+                return False
+            with open(output_pdf, 'rb') as f:
+                return b'/Count 3' in f.read()
+
+        def deliver():
+            # The oldest frame finishes syncing after the newer ones are in the PDF
+            while not page_count_reached():
+                time.sleep(0.02)
+            save_frame(0)
+
+        thread = threading.Thread(target=deliver)
+        thread.start()
+        watch_images_to_pdf(watch_dir, output_pdf, settle=0.1, idle_timeout=0.5, poll_interval=0.05, polling=True)
+        thread.join()
+
+        with open(output_pdf, 'rb') as f:
+            data = f.read()
+        rebuild_order = [Image.open(path).width for path in get_images_sorted_by_modification(watch_dir)]
+        self.assertEqual(rebuild_order, [10, 11, 12, 13])
+        self.assertEqual(page_widths(self, data), rebuild_order)
+
     def test_append_images_to_pdf_no_images(self):
         # Create a new empty directory for this test
         empty_dir = tempfile.mkdtemp()
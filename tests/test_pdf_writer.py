@@ -0,0 +1,230 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+import zlib
+from PIL import Image
+from service.pdf_writer import (
+    BitWriter, IncrementalPdfWriter, LinearizedPdfWriter, PdfWriter, build_page_tree, encode_image_stream,
+    prepare_jpeg_stream, prepare_png_stream, read_image_stream
+)
+
+
+def encode(img, fmt, **params):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def page_widths(test, data):
+    """
+    Walk the latest revision of a PDF's page tree, checking each node's /Parent and /Count,
+    and return the page widths in document order.
+    """
+    objects = dict(re.findall(rb'(?m)^(\d+) 0 obj\n(<<.*?>>)\n', data))
+    root = re.findall(rb'/Type /Catalog /Pages (\d+) 0 R', data)[-1]
+
+    def walk(ref, parent):
+        body = objects[ref]
+        if parent:
+            test.assertIn(b'/Parent %s 0 R' % parent, body)
+        if b'/Type /Pages' not in body:
+            return [int(re.search(rb'/MediaBox \[0 0 (\d+)', body).group(1))]
+        kids = re.search(rb'/Kids \[([^\]]*)\]', body).group(1).split(b' 0 R')
+        widths = [width for kid in kids if kid.strip() for width in walk(kid.strip(), ref)]
+        test.assertIn(b'/Count %d' % len(widths), body)
+        return widths
+
+    return walk(root, None)
+
+
+class TestPdfWriter(unittest.TestCase):
+
+    def test_prepare_jpeg_stream_passthrough(self):
+        data = encode(Image.new('RGB', (40, 30), color='blue'), 'JPEG')
+        stream = prepare_jpeg_stream(data)
+
+        self.assertEqual((stream.width, stream.height), (40, 30))
+        self.assertEqual(stream.color_space, '/DeviceRGB')
+        self.assertEqual(stream.filter, '/DCTDecode')
+        self.assertIs(stream.data, data)
+
+    def test_prepare_jpeg_stream_cmyk_falls_back(self):
+        data = encode(Image.new('CMYK', (10, 10)), 'JPEG')
+        self.assertIsNone(prepare_jpeg_stream(data))
+
+    def test_prepare_png_stream_passthrough(self):
+        img = Image.new('RGB', (7, 5), color=(10, 20, 30))
+        stream = prepare_png_stream(encode(img, 'PNG'))
+
+        self.assertEqual((stream.width, stream.height), (7, 5))
+        self.assertEqual(stream.filter, '/FlateDecode')
+        self.assertIn('/Predictor 15', stream.decode_parms)
+        self.assertIn('/Columns 7', stream.decode_parms)
+        # One filter-type byte per row followed by the RGB samples
+        self.assertEqual(len(zlib.decompress(stream.data)), 5 * (1 + 7 * 3))
+
+    def test_prepare_png_stream_palette(self):
+        img = Image.new('RGB', (4, 4), color='red').convert('P')
+        stream = prepare_png_stream(encode(img, 'PNG'))
+
+        self.assertTrue(stream.color_space.startswith('[/Indexed /DeviceRGB'))
+
+    def test_prepare_png_stream_alpha_and_interlace_fall_back(self):
+        self.assertIsNone(prepare_png_stream(encode(Image.new('RGBA', (4, 4)), 'PNG')))
+        # Pillow cannot write Adam7 PNGs, so flip the interlace byte of the IHDR chunk
+        data = bytearray(encode(Image.new('RGB', (4, 4)), 'PNG'))
+        data[28] = 1
+        self.assertIsNone(prepare_png_stream(bytes(data)))
+
+    def test_encode_image_stream_drops_alpha(self):
+        stream = encode_image_stream(Image.new('RGBA', (3, 2), color=(1, 2, 3, 4)))
+
+        self.assertEqual(stream.color_space, '/DeviceRGB')
+        self.assertEqual(zlib.decompress(stream.data), bytes([1, 2, 3]) * 6)
+
+    def test_write_pdf(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bmp_path = os.path.join(temp_dir, 'page.bmp')
+            Image.new('RGB', (20, 10), color='green').save(bmp_path)
+            pdf_path = os.path.join(temp_dir, 'out.pdf')
+
+            with PdfWriter(pdf_path) as writer:
+                writer.add_image_page(read_image_stream(bmp_path))
+                writer.add_image_page(read_image_stream(bmp_path))
+
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+
+        self.assertTrue(data.startswith(b'%PDF-1.5'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+        self.assertIn(b'/Count 2', data)
+        self.assertIn(b'/MediaBox [0 0 20 10]', data)
+        # The xref offsets must point at the objects they name
+        xref_offset = int(data.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        entries = data[xref_offset:].split(b'\n')[3:11]
+        for number, entry in enumerate(entries, start=1):
+            offset = int(entry[:10])
+            self.assertTrue(data[offset:].startswith(b'%d 0 obj' % number))
+
+    def test_write_incremental_pdf(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, 'out.pdf')
+            writer = IncrementalPdfWriter(pdf_path)
+            with open(pdf_path, 'rb') as f:
+                self.assertIn(b'/Count 0', f.read())
+
+            writer.add_image_page(encode_image_stream(Image.new('RGB', (20, 10))))
+            writer.commit()
+            with open(pdf_path, 'rb') as f:
+                first = f.read()
+            writer.add_image_page(encode_image_stream(Image.new('RGB', (30, 10))))
+            writer.close()
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+
+        # Earlier revisions are kept byte for byte and each update points back to the previous one
+        self.assertTrue(data.startswith(first))
+        self.assertTrue(first.endswith(b'%%EOF\n'))
+        self.assertIn(b'/Count 1', first)
+        self.assertIn(b'/Count 2', data[len(first):])
+        previous = int(first.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        self.assertIn(b'/Prev %d' % previous, data[len(first):])
+
+    def test_incremental_updates_rewrite_only_the_changed_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, 'out.pdf')
+            writer = IncrementalPdfWriter(pdf_path, page_tree_fanout=3)
+            update_sizes = []
+            for width in range(1, 41):
+                size = os.path.getsize(pdf_path)
+                writer.add_image_page(encode_image_stream(Image.new('L', (width, 1))))
+                writer.commit()
+                update_sizes.append(os.path.getsize(pdf_path) - size)
+            writer.close()
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+
+        # Updates grow with the depth of the tree, not with the number of pages
+        self.assertLess(max(update_sizes[27:]), 2 * max(update_sizes[:9]))
+        for kids in re.findall(rb'/Kids \[([^\]]*)\]', data):
+            self.assertLessEqual(kids.count(b' 0 R'), 3)
+
+        self.assertEqual(page_widths(self, data), list(range(1, 41)))
+
+    def test_incremental_pages_inserted_in_place(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, 'out.pdf')
+            writer = IncrementalPdfWriter(pdf_path, page_tree_fanout=3)
+            expected = []
+            for width in range(1, 41):
+                # Mostly appends, with every third page going in at the front or the middle
+                position = [len(expected), 0, len(expected) // 2][width % 3]
+                writer.add_image_page(encode_image_stream(Image.new('L', (width, 1))), position)
+                expected.insert(position, width)
+                if width % 4 == 0:
+                    writer.commit()
+            with self.assertRaises(IndexError):
+                writer.add_image_page(encode_image_stream(Image.new('L', (1, 1))), 42)
+            writer.close()
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+
+        for kids in re.findall(rb'/Kids \[([^\]]*)\]', data):
+            self.assertLessEqual(kids.count(b' 0 R'), 3)
+        self.assertEqual(page_widths(self, data), expected)
+
+    def test_bit_writer(self):
+        bits = BitWriter()
+        bits.write(0b101, 3)
+        bits.write(0b11, 2)
+        bits.pad()
+        bits.write_items([1, 2, 3], 4)
+
+        self.assertEqual(bytes(bits.data), bytes([0b10111000, 0x12, 0x30]))
+
+    def test_build_page_tree(self):
+        nodes = build_page_tree(10, 4)
+
+        # Three leaves of up to 4 pages, then a root over them
+        self.assertEqual([count for _, count in nodes], [4, 4, 2, 10])
+        self.assertEqual(nodes[-1][0], [('node', 0), ('node', 1), ('node', 2)])
+        self.assertEqual(build_page_tree(1, 4), [([('page', 0)], 1)])
+
+    def test_write_linearized_pdf(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, 'out.pdf')
+            with LinearizedPdfWriter(pdf_path, page_tree_fanout=2) as writer:
+                for width in (20, 30, 40, 50, 60):
+                    writer.add_image_page(encode_image_stream(Image.new('RGB', (width, 10))))
+
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+
+        params = dict(
+            (key, int(value)) for key, value in re.findall(rb'/(L|O|E|N|T) (\d+)', data[:300])
+        )
+        hint_offset, hint_length = map(int, re.search(rb'/H \[(\d+) (\d+)\]', data[:300]).groups())
+
+        self.assertIn(b'/Linearized 1', data[:1024])
+        self.assertEqual(params[b'L'], len(data))
+        self.assertEqual(params[b'N'], 5)
+        self.assertTrue(data[hint_offset:].startswith(b'%d 0 obj' % (params[b'O'] - 1)))
+        self.assertTrue(data[hint_offset + hint_length:].startswith(b'%d 0 obj' % params[b'O']))
+        # The first page, and nothing after it, ends at /E
+        self.assertIn(b'/MediaBox [0 0 20 10]', data[:params[b'E']])
+        self.assertNotIn(b'/MediaBox [0 0 30 10]', data[:params[b'E']])
+        # The main xref stream follows the 3 objects of each remaining page and the object stream
+        self.assertTrue(data[params[b'T']:].startswith(b'%d 0 obj\n<< /Type /XRef' % (3 * 4 + 2)))
+        self.assertIn(b'/Type /ObjStm', data)
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+
+    def test_write_linearized_pdf_without_pages(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(ValueError):
+                LinearizedPdfWriter(os.path.join(temp_dir, 'out.pdf')).close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from PIL import Image
+from service.recompressor import (
+    INTERMEDIATE_FORMATS, BackgroundRecompressor, needs_recompression, recompress_image, recompress_images
+)
+
+
+class TestRecompressor(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def save_intermediate(self, name, fmt, modified_time=1000):
+        ext, params = INTERMEDIATE_FORMATS[fmt]
+        path = os.path.join(self.temp_dir.name, name + ext)
+        Image.new('RGB', (32, 16), color=(12, 34, 56)).save(path, **params)
+        os.utime(path, (modified_time, modified_time))
+        return path
+
+    def test_needs_recompression(self):
+        self.assertFalse(needs_recompression('png'))
+        self.assertTrue(needs_recompression('png-fast'))
+        self.assertTrue(needs_recompression('tiff'))
+
+    def test_recompress_tiff_to_png(self):
+        path = self.save_intermediate('frame', 'tiff', modified_time=1234)
+
+        result = recompress_image(path)
+
+        self.assertEqual(result, os.path.splitext(path)[0] + '.png')
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.path.getmtime(result), 1234)
+        with Image.open(result) as img:
+            self.assertEqual(img.format, 'PNG')
+            self.assertEqual(img.getpixel((0, 0)), (12, 34, 56))
+
+    def test_recompress_png_in_place(self):
+        path = self.save_intermediate('frame', 'png-fast')
+
+        self.assertEqual(recompress_image(path), path)
+        self.assertEqual(os.listdir(self.temp_dir.name), ['frame.png'])
+
+    def test_recompress_failure(self):
+        path = os.path.join(self.temp_dir.name, 'broken.tiff')
+        with open(path, 'w') as f:
+            f.write('not an image')
+
+        self.assertIsNone(recompress_image(path))
+        self.assertEqual(os.listdir(self.temp_dir.name), ['broken.tiff'])
+
+    def test_recompress_images(self):
+        paths = [self.save_intermediate(f'frame_{i}', 'tiff') for i in range(3)]
+
+        results = recompress_images(paths, processes=2)
+
+        self.assertEqual(results, [os.path.splitext(path)[0] + '.png' for path in paths])
+
+    def test_background_recompressor(self):
+        recompressor = BackgroundRecompressor()
+        paths = [self.save_intermediate(f'frame_{i}', 'tiff-deflate') for i in range(2)]
+        for path in paths:
+            recompressor.submit(path)
+
+        results = recompressor.close()
+
+        self.assertEqual(results, [os.path.splitext(path)[0] + '.png' for path in paths])
+        self.assertTrue(all(os.path.exists(path) for path in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -120,6 +120,45 @@ class TestScreenshooter(unittest.TestCase):
         self.assertEqual(result, final_save_path)
 
 
+    def test_save_screenshot_reuses_stored_frame(self):
+        # Test save_screenshot copies an identical frame from the store instead of encoding it
+        from service.frame_store import FrameStore
+        screenshot = Image.new('RGB', (10, 10), color='red')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FrameStore(os.path.join(temp_dir, 'store'))
+            first = save_screenshot(screenshot, os.path.join(temp_dir, 'first.png'), store)
+
+            with patch.object(Image.Image, 'save') as mock_save:
+                second = save_screenshot(screenshot.copy(), os.path.join(temp_dir, 'second.png'), store)
+                mock_save.assert_not_called()
+
+            with open(first, 'rb') as a, open(second, 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+
+
+    def test_save_screenshot_store_keeps_encodings_apart(self):
+        # A frame stored in a fast intermediate encoding is not reused for the archival one
+        from service.frame_store import FrameStore
+        from service.recompressor import INTERMEDIATE_FORMATS
+        screenshot = Image.effect_noise((64, 64), 64).convert('RGB')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FrameStore(os.path.join(temp_dir, 'store'))
+            fast = save_screenshot(screenshot, os.path.join(temp_dir, 'fast.png'), store,
+                                   INTERMEDIATE_FORMATS['png-fast'][1])
+            archival = save_screenshot(screenshot.copy(), os.path.join(temp_dir, 'archival.png'), store,
+                                       INTERMEDIATE_FORMATS['png'][1])
+            expected = os.path.join(temp_dir, 'expected.png')
+            screenshot.save(expected)
+
+            with open(fast, 'rb') as a, open(archival, 'rb') as b, open(expected, 'rb') as c:
+                archival_data = b.read()
+                self.assertNotEqual(a.read(), archival_data)
+                self.assertEqual(archival_data, c.read())
+            self.assertEqual(len(store.entries), 2)
+
+
     def test_save_screenshot_failure(self):
         # Test save_screenshot failure
         mock_screenshot = MagicMock(spec=Image.Image)
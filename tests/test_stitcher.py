@@ -0,0 +1,64 @@
+import random
+import unittest
+from PIL import Image
+from service.stitcher import ScrollStitcher, find_overlap, row_hashes
+
+
+def noise_document(width, height, seed=0):
+    data = random.Random(seed).randbytes(width * height * 3)
+    return Image.frombytes('RGB', (width, height), data)
+
+
+class TestStitcher(unittest.TestCase):
+
+    def test_row_hashes(self):
+        img = Image.new('L', (4, 3))
+        img.putpixel((0, 1), 255)
+
+        hashes = row_hashes(img)
+
+        self.assertEqual(len(hashes), 3)
+        self.assertEqual(hashes[0], hashes[2])
+        self.assertNotEqual(hashes[0], hashes[1])
+
+    def test_find_overlap(self):
+        self.assertEqual(find_overlap([1, 2, 3, 4, 5], [3, 4, 5, 6, 7]), 3)
+        self.assertEqual(find_overlap([1, 2, 3], [1, 2, 3]), 3)
+        self.assertEqual(find_overlap([1, 2, 3], [7, 8, 9]), 0)
+        self.assertEqual(find_overlap([1, 2, 3, 4], [3, 4, 9], min_overlap=3), 0)
+        # Repeated rows: the largest overlap, i.e. the smallest scroll, wins
+        self.assertEqual(find_overlap([5, 5, 5, 5], [5, 5, 5, 6]), 3)
+
+    def test_rejects_non_positive_page_height(self):
+        for page_height in (0, -100):
+            with self.assertRaises(ValueError):
+                ScrollStitcher(page_height)
+
+    def test_stitch_reconstructs_document(self):
+        document = noise_document(20, 500)
+        stitcher = ScrollStitcher(page_height=120)
+        pages = []
+        # Uneven scroll steps, ending with a repeated frame at the bottom of the document
+        for top in (0, 70, 95, 180, 260, 350, 400, 400):
+            pages += stitcher.add_frame(document.crop((0, top, 20, top + 100)))
+        pages += stitcher.finish()
+
+        self.assertEqual([page.height for page in pages], [120, 120, 120, 120, 20])
+        stitched = Image.new('RGB', (20, 500))
+        for index, page in enumerate(pages):
+            stitched.paste(page, (0, index * 120))
+        self.assertEqual(stitched.tobytes(), document.tobytes())
+
+    def test_stitch_rejects_width_change(self):
+        stitcher = ScrollStitcher(page_height=10)
+        stitcher.add_frame(Image.new('RGB', (10, 10)))
+
+        with self.assertRaises(ValueError):
+            stitcher.add_frame(Image.new('RGB', (12, 10)))
+
+    def test_finish_without_frames(self):
+        self.assertEqual(ScrollStitcher(page_height=10).finish(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import threading
+import unittest
+from PIL import Image
+from tests.harness import SimulatedSlideshow, VirtualClock
+from service.timed_capture import FrameRing, TimedCapture
+
+
+class TestTimedCapture(unittest.TestCase):
+
+    def test_frame_ring_drops_when_full(self):
+        frame = Image.new('RGB', (8, 4), color=(1, 2, 3))
+        ring = FrameRing(frame.size, frame.mode, max_bytes=2 * 8 * 4 * 3)
+
+        self.assertTrue(ring.put(frame, 10))
+        self.assertTrue(ring.put(frame, 20))
+        self.assertFalse(ring.put(frame, 30))
+        self.assertEqual(ring.dropped, 1)
+
+        sequence, index, timestamp = ring.take()
+        self.assertEqual((sequence, timestamp), (0, 10))
+        self.assertEqual(bytes(ring.slots[index]), frame.tobytes())
+        ring.release(index)
+        self.assertTrue(ring.put(frame, 40))
+
+        ring.close()
+        self.assertEqual([item[0] for item in iter(ring.take, None)], [1, 2])
+
+    def test_frame_ring_rejects_mismatched_frames(self):
+        ring = FrameRing((8, 4), 'RGB', max_bytes=1024)
+        with self.assertRaises(ValueError):
+            ring.put(Image.new('RGB', (4, 4)), 0)
+        with self.assertRaises(ValueError):
+            FrameRing((8, 4), 'RGB', max_bytes=8 * 4 * 3)
+
+    def test_capture_rate_and_dedupe(self):
+        clock = VirtualClock()
+        slideshow = SimulatedSlideshow(4, clock, slide_seconds=0.5)
+        saved = []
+
+        def save_frame(frame, index, captured_ns):
+            saved.append((index, slideshow.page_of(frame)))
+            return f"frame_{index}"
+
+        capture = TimedCapture(slideshow.screenshot, save_frame, fps=10, clock=clock.time, sleep=clock.sleep)
+        paths, stats = capture.run(20)
+
+        self.assertEqual(sorted(saved), [(0, 0), (5, 1), (10, 2), (15, 3)])
+        self.assertEqual(paths, ['frame_0', 'frame_5', 'frame_10', 'frame_15'])
+        self.assertEqual(stats['captured'], 20)
+        self.assertEqual(stats['duplicates'], 16)
+        self.assertEqual((stats['saved'], stats['dropped'], stats['missed'], stats['failed']), (4, 0, 0, 0))
+        self.assertAlmostEqual(stats['fps'], 10)
+        self.assertAlmostEqual(stats['jitter_ms'], 0, places=6)
+        self.assertAlmostEqual(clock.time(), 1.9)
+
+    def test_drops_frames_under_backpressure(self):
+        clock = VirtualClock()
+        slideshow = SimulatedSlideshow(10, clock, slide_seconds=0.1, size=(16, 8))
+        encoder_blocked = threading.Event()
+        grabs = []
+
+        def grab():
+            grabs.append(clock.time())
+            if len(grabs) == 10:
+                encoder_blocked.set()
+            return slideshow.screenshot()
+
+        def save_frame(frame, index, captured_ns):
+            encoder_blocked.wait()
+            return f"frame_{index}"
+
+        capture = TimedCapture(grab, save_frame, fps=10, max_buffer_bytes=2 * 16 * 8 * 3,
+                               consumers=1, clock=clock.time, sleep=clock.sleep)
+        paths, stats = capture.run(10)
+
+        self.assertEqual(stats['captured'], 10)
+        self.assertEqual(stats['duplicates'], 0)
+        self.assertEqual(stats['saved'] + stats['dropped'], 10)
+        # One frame in the blocked encoder and two in the buffer, then everything is dropped
+        self.assertGreaterEqual(stats['dropped'], 6)
+        self.assertLessEqual(stats['dropped'], 8)
+        self.assertEqual(len(paths), stats['saved'])
+
+    def test_missed_ticks_when_grabbing_is_slow(self):
+        clock = VirtualClock()
+        slideshow = SimulatedSlideshow(3, clock, slide_seconds=1)
+
+        def slow_grab():
+            clock.sleep(0.25)
+            return slideshow.screenshot()
+
+        capture = TimedCapture(slow_grab, lambda frame, index, captured_ns: f"frame_{index}", fps=10,
+                               clock=clock.time, sleep=clock.sleep)
+        _, stats = capture.run(10)
+
+        self.assertGreater(stats['missed'], 0)
+        self.assertEqual(stats['captured'] + stats['missed'], 10)
+        self.assertLess(stats['fps'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
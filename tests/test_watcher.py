@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+from PIL import Image
+from service.watcher import Debouncer, InotifyWatcher, PollingWatcher, is_image_complete
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_is_image_complete(self):
+        for name in ('a.png', 'b.jpg', 'c.bmp'):
+            Image.new('RGB', (20, 20), color='red').save(self.path(name))
+            self.assertTrue(is_image_complete(self.path(name)))
+
+            with open(self.path(name), 'rb') as f:
+                data = f.read()
+            with open(self.path('partial_' + name), 'wb') as f:
+                f.write(data[:len(data) // 2])
+            self.assertFalse(is_image_complete(self.path('partial_' + name)))
+
+        self.assertFalse(is_image_complete(self.path('missing.png')))
+
+    def test_debouncer(self):
+        now = [0.0]
+        debouncer = Debouncer(2.0, clock=lambda: now[0])
+
+        self.assertIsNone(debouncer.next_deadline())
+        debouncer.touch({'a.png'})
+        now[0] = 1.0
+        debouncer.touch({'b.png'})
+        self.assertEqual(debouncer.next_deadline(), 1.0)
+        self.assertEqual(debouncer.settled(), set())
+
+        now[0] = 2.5
+        self.assertEqual(debouncer.settled(), {'a.png'})
+        # A new change restarts the quiet period
+        debouncer.touch({'b.png'})
+        now[0] = 4.0
+        self.assertEqual(debouncer.settled(), set())
+        now[0] = 4.5
+        self.assertEqual(debouncer.settled(), {'b.png'})
+
+    def test_polling_watcher(self):
+        with open(self.path('old.png'), 'wb') as f:
+            f.write(b'old')
+        watcher = PollingWatcher(self.temp_dir.name)
+
+        self.assertEqual(watcher.changes(0), set())
+        with open(self.path('new.png'), 'wb') as f:
+            f.write(b'new')
+        with open(self.path('old.png'), 'ab') as f:
+            f.write(b'more')
+
+        self.assertEqual(watcher.changes(0), {'new.png', 'old.png'})
+        self.assertEqual(watcher.changes(0), set())
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_inotify_watcher(self):
+        watcher = InotifyWatcher(self.temp_dir.name)
+        self.addCleanup(watcher.close)
+
+        self.assertEqual(watcher.changes(0), set())
+        with open(self.path('new.png'), 'wb') as f:
+            f.write(b'new')
+        os.rename(self.path('new.png'), self.path('moved.png'))
+
+        self.assertEqual(watcher.changes(1), {'new.png', 'moved.png'})
+
+
+if __name__ == '__main__':
+    unittest.main()
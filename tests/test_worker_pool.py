@@ -0,0 +1,133 @@
+import json
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from service.worker_pool import (
+    format_progress, free_display_numbers, load_jobs, run_job, run_worker_pool, schedule_jobs,
+    start_display_workers
+)
+
+
+# Read when a spawned worker imports this module, like pyautogui reads it on import
+IMPORT_DISPLAY = os.environ.get('DISPLAY')
+
+
+def report_display(display, events):
+    events.put((display, IMPORT_DISPLAY))
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write_jobs(self, data):
+        path = os.path.join(self.temp_dir.name, 'jobs.json')
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        return path
+
+    def test_load_jobs(self):
+        path = self.write_jobs([
+            {'command': 'evince "a b.pdf"', 'output': 'out/a', 'repeat': 3, 'roi': [0, 0, 10, 10]},
+            {'command': ['okular', 'b.pdf'], 'output': 'out/b'},
+            {'output': 'out/c'},
+        ])
+
+        with patch('builtins.print'):
+            jobs = load_jobs(path)
+
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0]['command'], ['evince', 'a b.pdf'])
+        self.assertEqual(jobs[0]['roi'], (0, 0, 10, 10))
+        self.assertEqual(jobs[1]['command'], ['okular', 'b.pdf'])
+        self.assertIsNone(jobs[1]['roi'])
+        self.assertEqual(jobs[1]['repeat'], 5)  # default from resources/single_key.json
+
+    def test_load_jobs_invalid_file(self):
+        path = self.write_jobs({'command': 'evince'})
+
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(load_jobs(path), [])
+            mock_print.assert_called_once()
+
+    def test_schedule_jobs_longest_first(self):
+        jobs = [{'id': 0, 'repeat': 5}, {'id': 1, 'repeat': 50}, {'id': 2, 'repeat': 10}]
+
+        self.assertEqual([job['id'] for job in schedule_jobs(jobs)], [1, 2, 0])
+
+    def test_format_progress(self):
+        jobs = [{'repeat': 10}, {'repeat': 30}]
+
+        self.assertEqual(format_progress(jobs, {0: 10, 1: 10}, 1), "Jobs 1/2, frames 20/40 (50%)")
+
+    @patch('service.worker_pool.os.path.exists')
+    def test_free_display_numbers_skips_locked(self, mock_exists):
+        mock_exists.side_effect = lambda path: path in ('/tmp/.X100-lock', '/tmp/.X11-unix/X102')
+
+        self.assertEqual(free_display_numbers(2), [101, 103])
+
+    def test_workers_import_with_their_own_display(self):
+        ctx = multiprocessing.get_context('spawn')
+        events = ctx.Queue()
+
+        with patch.dict(os.environ, {'DISPLAY': ':0'}):
+            processes = start_display_workers(ctx, [':7', ':8'], report_display, (events,))
+            self.assertEqual(os.environ['DISPLAY'], ':0')
+        for process in processes:
+            process.join()
+
+        self.assertEqual(sorted(events.get(timeout=10) for _ in processes), [(':7', ':7'), (':8', ':8')])
+
+    def test_parent_imports_without_display(self):
+        env = {name: value for name, value in os.environ.items() if name != 'DISPLAY'}
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        result = subprocess.run([sys.executable, '-c', 'import main'], cwd=root, env=env,
+                                capture_output=True, text=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    @patch('service.worker_pool.free_display_numbers', return_value=[100, 101])
+    @patch('service.worker_pool.start_virtual_display')
+    def test_started_displays_stopped_when_one_fails(self, mock_start, mock_free):
+        server = mock_start.return_value
+        mock_start.side_effect = [server, RuntimeError("Xvfb failed to start on display :101")]
+
+        with self.assertRaises(RuntimeError):
+            run_worker_pool([{'id': 0, 'repeat': 1}, {'id': 1, 'repeat': 1}], workers=2)
+
+        server.terminate.assert_called_once()
+        server.wait.assert_called_once()
+
+    @patch('service.pdf_handler.save_images_to_pdf')
+    @patch('service.input_simulator.simulate_key')
+    @patch('service.screenshooter.save_screenshot')
+    @patch('service.screenshooter.take_screenshot_roi')
+    @patch('service.worker_pool.time.sleep')
+    @patch('service.worker_pool.subprocess.Popen')
+    def test_run_job(self, mock_popen, mock_sleep, mock_take_roi, mock_save, mock_key, mock_save_pdf):
+        output = os.path.join(self.temp_dir.name, 'out')
+        job = {'id': 7, 'command': ['viewer'], 'output': output, 'repeat': 2, 'roi': (0, 0, 5, 5),
+               'skey': 'right', 'delay': 0.5, 'startup_delay': 3}
+        mock_save_pdf.return_value = os.path.join(output, 'output.pdf')
+        events = queue.Queue()
+
+        result = run_job(job, ':101', events)
+
+        self.assertEqual(result, os.path.join(output, 'output.pdf'))
+        self.assertEqual(mock_popen.call_args.kwargs['env']['DISPLAY'], ':101')
+        mock_popen.return_value.terminate.assert_called_once()
+        self.assertEqual(mock_save.call_count, 2)
+        mock_key.assert_called_with('right')
+        self.assertEqual([events.get(), events.get()], [('progress', 7, 1, 2), ('progress', 7, 2, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()